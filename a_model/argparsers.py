@@ -1,8 +1,67 @@
 import argparse
 import datetime
+import collections
 
+import numpy
 
-class SimulationParser(argparse.ArgumentParser):
+from .simulation import OUTCOMES, DEFAULT_SEED
+from .summaries import FORMATS
+
+
+class BaseSimulationParser(argparse.ArgumentParser):
+    """Arguments that every script that simulates universes shares"""
+
+    n_universes_help = 'the number of universes to simulate'
+
+    def __init__(self, *args, **kwargs):
+        super(BaseSimulationParser, self).__init__(*args, **kwargs)
+        self.add_argument(
+            '--n-universes',
+            metavar='U',
+            type=int,
+            help=self.n_universes_help,
+            default=1000,
+        )
+        self.add_argument(
+            '--seed',
+            metavar='S',
+            type=int,
+            help=(
+                'master random seed for the simulated universes (default '
+                '%d, so that repeated runs reuse the same universes)' %
+                DEFAULT_SEED
+            ),
+            default=DEFAULT_SEED,
+        )
+        self.add_argument(
+            '--n-workers',
+            metavar='W',
+            type=int,
+            help=(
+                'the number of processes to use (default 1). Only worth it '
+                'for many thousands of universes, since every process pays '
+                'for its own start up'
+            ),
+            default=1,
+        )
+        self.add_argument(
+            '-v', '--verbose',
+            action="store_true",
+            help='print more information during the simulations',
+        )
+        self.add_argument(
+            '--cache-stats',
+            action="store_true",
+            help='print cache hits, misses, evictions and bytes read/written',
+        )
+
+
+class SimulationParser(BaseSimulationParser):
+
+    n_universes_help = (
+        'the number of universes to simulate (the maximum number when '
+        'simulating until convergence with --tolerance)'
+    )
 
     def __init__(self, *args, **kwargs):
         super(SimulationParser, self).__init__(*args, **kwargs)
@@ -15,21 +74,55 @@ class SimulationParser(argparse.ArgumentParser):
             default=12,
         )
         self.add_argument(
-            '--n-universes',
-            metavar='U',
-            type=int,
-            help='the number of universes to simulate',
-            default=1000,
+            '--tolerance',
+            metavar='P',
+            type=float,
+            help=(
+                'simulate until the confidence intervals on the outcome '
+                'probabilities are within this tolerance'
+            ),
         )
         self.add_argument(
-            '-v', '--verbose',
-            action="store_true",
-            help='print more information during the simulations',
+            '--cash-tolerance',
+            metavar='C',
+            type=float,
+            help=(
+                'with --tolerance, also simulate until the confidence '
+                'intervals on the median cash are within this many dollars '
+                '(default a tenth of the monthly costs)'
+            ),
+        )
+        self.add_argument(
+            '--max-seconds',
+            metavar='T',
+            type=float,
+            help='with --tolerance, stop simulating after this many seconds',
+        )
+        self.add_argument(
+            '--engine',
+            choices=['monte-carlo', 'exact'],
+            help=(
+                'simulate universes with random numbers or compute the '
+                'distribution of outcomes without sampling, which can only be '
+                'summarized rather than plotted for the cash in the bank and '
+                'bonuses (default monte-carlo)'
+            ),
+            default='monte-carlo',
+        )
+        self.add_argument(
+            '--summary',
+            choices=FORMATS,
+            help=(
+                'print a summary in this format instead of plotting, which '
+                'also skips importing the plotting libraries'
+            ),
         )
 
 
 class HiringParser(SimulationParser):
 
+    n_universes_help = BaseSimulationParser.n_universes_help
+
     def __init__(self, *args, **kwargs):
         super(HiringParser, self).__init__(*args, **kwargs)
         self.add_argument(
@@ -39,3 +132,145 @@ class HiringParser(SimulationParser):
             help='the number of new people to consider adding to Datascope',
             default=3,
         )
+        self.add_argument(
+            '--start-months',
+            metavar='S',
+            type=int,
+            nargs='+',
+            help=(
+                'the number of months from now that each new person starts '
+                '(default everyone starts now)'
+            ),
+        )
+
+    def parse_args(self, *args, **kwargs):
+        args = super(HiringParser, self).parse_args(*args, **kwargs)
+
+        # every headcount is simulated against the same universes in one go,
+        # so there is no simulating until convergence
+        if (args.tolerance is not None or args.cash_tolerance is not None or
+                args.max_seconds is not None):
+            self.error(
+                '--tolerance, --cash-tolerance and --max-seconds are not '
+                'supported when simulating hiring risk'
+            )
+        if args.start_months is None:
+            args.start_months = [0] * args.n_n00bs
+        elif len(args.start_months) != args.n_n00bs:
+            self.error('--start-months needs one month for each new person')
+        return args
+
+
+class UniverseParser(BaseSimulationParser):
+    """Arguments for scripts that evaluate outcomes in a single month against
+    one shared set of simulated universes
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(UniverseParser, self).__init__(*args, **kwargs)
+        self.add_argument(
+            '--month',
+            metavar='M',
+            type=int,
+            help='the month to evaluate outcomes in (default end of year)',
+        )
+
+
+class SensitivityParser(UniverseParser):
+
+    def __init__(self, *args, **kwargs):
+        super(SensitivityParser, self).__init__(*args, **kwargs)
+        self.add_argument(
+            '--vary',
+            metavar=('PARAMETER', 'START', 'STOP', 'N'),
+            nargs=4,
+            action='append',
+            help=(
+                'try N evenly spaced values of a config.ini PARAMETER from '
+                'START to STOP (can be repeated to vary several parameters)'
+            ),
+            default=[],
+        )
+
+    def parse_args(self, *args, **kwargs):
+        args = super(SensitivityParser, self).parse_args(*args, **kwargs)
+        args.ranges = collections.OrderedDict()
+        for name, start, stop, n in args.vary:
+            try:
+                args.ranges[name] = numpy.linspace(
+                    float(start), float(stop), int(n),
+                )
+            except ValueError:
+                self.error('--vary needs numbers for START, STOP and N')
+        return args
+
+
+class SolverParser(UniverseParser):
+
+    def __init__(self, *args, **kwargs):
+        super(SolverParser, self).__init__(*args, **kwargs)
+        self.add_argument(
+            'solve',
+            choices=['hires', 'take-home-pay', 'hourly-rate'],
+            help=(
+                'find the most people we can hire, the largest scaling of '
+                'everyone\'s take-home pay targets or the lowest hourly rate '
+                'for new people that meets the risk constraints'
+            ),
+        )
+        self.add_argument(
+            '--max-probability',
+            metavar=('OUTCOME', 'P'),
+            nargs=2,
+            action='append',
+            help=(
+                'keep the probability of an OUTCOME or worse at or below P '
+                'in every month (default "bye bye" 0.05)'
+            ),
+            default=[],
+        )
+        self.add_argument(
+            '--min-probability',
+            metavar=('OUTCOME', 'P'),
+            nargs=2,
+            action='append',
+            help='keep the probability of an OUTCOME or better at or above P',
+            default=[],
+        )
+        self.add_argument(
+            '--n-n00bs',
+            metavar='N',
+            type=int,
+            help='the number of new people for hourly-rate (default 1)',
+            default=1,
+        )
+        self.add_argument(
+            '--start-month',
+            metavar='S',
+            type=int,
+            help='the number of months from now that new people start',
+            default=0,
+        )
+
+    def _parse_probabilities(self, pairs):
+        probabilities = {}
+        for outcome, probability in pairs:
+            if outcome not in OUTCOMES:
+                self.error('OUTCOME must be one of: %s' % ', '.join(OUTCOMES))
+            try:
+                probabilities[outcome] = float(probability)
+            except ValueError:
+                self.error('P must be a probability between 0 and 1')
+        return probabilities
+
+    def parse_args(self, *args, **kwargs):
+        args = super(SolverParser, self).parse_args(*args, **kwargs)
+        args.max_probabilities = self._parse_probabilities(
+            args.max_probability,
+        )
+        args.min_probabilities = self._parse_probabilities(
+            args.min_probability,
+        )
+        if not args.max_probabilities and not args.min_probabilities:
+            args.max_probabilities = {'bye bye': 0.05}
+        return args
@@ -0,0 +1,359 @@
+"""Size-bounded cache for the results of simulations. Results live in two
+tiers: a memory tier of unpickled values and a disk tier of files in
+`utils.DATA_ROOT`. Each tier has a budget in bytes and the least recently used
+entries are evicted once a tier goes over its budget. Files on disk that are
+older than `utils.MAX_CACHE_AGE` are deleted rather than left behind. Only
+the files in the directories that the cache owns are ever deleted, which are
+its root (but not the directories in it) and any directory that is handed
+over to it with `Cache.add_directory`.
+
+The cache also keeps count of hits, misses, evictions and the bytes that are
+read from and written to disk, which the scripts print with --cache-stats.
+
+Several scripts can share the cache at once. Files are written to a temporary
+file and renamed into place, so readers never see a partial file, and each
+key has a lock so that only one process computes a missing result while the
+others wait for it. Lock files are only deleted while nobody holds them.
+Files that are corrupt anyway are recomputed.
+"""
+
+import os
+import sys
+import time
+import errno
+import fcntl
+import hashlib
+import tempfile
+import contextlib
+import collections
+import cPickle as pickle
+
+from . import utils
+
+# extensions of the files in the directories of the cache that belong to it.
+# Anything else (e.g., the reports from quickbooks) is never touched.
+CACHE_EXTENSIONS = ('.pkl', '.npy', '.npz')
+
+# extensions of the lock files and the temporary files that are renamed into
+# place. These don't count towards the disk budget, but are deleted along
+# with the rest of the cache files once they expire.
+LOCK_EXTENSION = '.lock'
+TEMPORARY_EXTENSION = '.tmp'
+
+# returned by `Cache.get` when there is nothing in the cache for a key, since
+# None is a perfectly good result
+MISSING = object()
+
+
+class CorruptCacheFile(Exception):
+    pass
+
+
+def makedirs(path):
+    """Make the directory `path` unless another process got there first"""
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+
+
+def atomic_write(filename, write):
+    """Write `filename` by calling `write` with a temporary file in the same
+    directory and then renaming it, so that other processes see either the
+    previous file or the whole new one and never a partially written file
+    """
+    fd, temporary_filename = tempfile.mkstemp(
+        dir=os.path.dirname(filename), suffix=TEMPORARY_EXTENSION,
+    )
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            write(stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.rename(temporary_filename, filename)
+    except:
+        os.remove(temporary_filename)
+        raise
+
+
+def pack(value):
+    """Pickle `value` behind a checksum of the pickle"""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return hashlib.sha1(data).hexdigest() + '\n' + data
+
+
+def unpack(data):
+    """Unpickle data from `pack`, making sure it is intact"""
+    checksum, _, data = data.partition('\n')
+    if hashlib.sha1(data).hexdigest() != checksum:
+        raise CorruptCacheFile
+    return pickle.loads(data)
+
+
+def format_bytes(n_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n_bytes) < 1024 or unit == 'GB':
+            break
+        n_bytes /= 1024.0
+    return '%.1f %s' % (n_bytes, unit)
+
+
+class Cache(object):
+    """Two-tier LRU cache with `memory_budget` and `disk_budget` bytes in
+    `root`
+    """
+
+    def __init__(self, root=None, memory_budget=None, disk_budget=None,
+                 max_age=None):
+        self.root = root or utils.DATA_ROOT
+        if memory_budget is None:
+            memory_budget = utils.MAX_CACHE_MEMORY
+        if disk_budget is None:
+            disk_budget = utils.MAX_CACHE_DISK
+        if max_age is None:
+            max_age = utils.MAX_CACHE_AGE
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.max_age = max_age
+        self.lock_root = os.path.join(self.root, 'locks')
+        self.directories = [self.root]
+
+        # the memory tier maps keys to (value, n_bytes) in order of use
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._cleaned_up = False
+        self.stats = collections.Counter()
+
+    def add_directory(self, directory):
+        """Let the cache expire and evict the files in `directory` (e.g., the
+        batches of a `store.ResultStore`) along with its own
+        """
+        if directory not in self.directories:
+            self.directories.append(directory)
+
+    def get_filename(self, key):
+        return os.path.join(self.root, key + '.pkl')
+
+    def get(self, key, count_miss=True):
+        """Get the value for `key` from memory or disk, or `MISSING`"""
+        if key in self._memory:
+            self._memory[key] = self._memory.pop(key)
+            self.stats['memory hits'] += 1
+            return self._memory[key][0]
+
+        self.cleanup_once()
+        filename = self.get_filename(key)
+        value, n_bytes = MISSING, 0
+        if self.is_current(filename):
+            value, n_bytes = self._read(filename)
+        if value is MISSING:
+            if count_miss:
+                self.stats['misses'] += 1
+            return MISSING
+        self.stats['disk hits'] += 1
+        self._remember(key, value, n_bytes)
+        return value
+
+    def _read(self, filename):
+        # the file can disappear if another process evicts it, and files
+        # that are corrupt are removed to be computed again
+        try:
+            with open(filename, 'rb') as stream:
+                data = stream.read()
+            value = unpack(data)
+        except (IOError, OSError):
+            return MISSING, 0
+        except Exception:
+            self.record_corrupt(filename)
+            return MISSING, 0
+        self.touch(filename)
+        self.record_read(len(data))
+        return value, len(data)
+
+    def put(self, key, value):
+        """Store `value` for `key` in memory and on disk"""
+        data = pack(value)
+        makedirs(self.root)
+        atomic_write(
+            self.get_filename(key), lambda stream: stream.write(data),
+        )
+        self.record_write(len(data))
+        self._remember(key, value, len(data))
+        self.enforce_disk_budget()
+
+    def get_or_run(self, key, function, *args, **kwargs):
+        """Get the value for `key`, or run `function` to compute it. Only one
+        process computes any given key at a time. The others wait for it to
+        finish and then read its result from disk.
+        """
+        value = self.get(key, count_miss=False)
+        if value is not MISSING:
+            return value
+        with self.lock(key):
+            value = self.get(key)
+            if value is MISSING:
+                value = function(*args, **kwargs)
+                self.put(key, value)
+        return value
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Hold the lock for `key`, which is shared between processes"""
+        makedirs(self.lock_root)
+        filename = os.path.join(self.lock_root, key + LOCK_EXTENSION)
+        while True:
+            stream = open(filename, 'a')
+            fcntl.flock(stream, fcntl.LOCK_EX)
+
+            # `cleanup` may have deleted the lock file after we opened it,
+            # in which case another process can lock a new one, so try again
+            try:
+                is_current = os.path.samestat(
+                    os.fstat(stream.fileno()), os.stat(filename),
+                )
+            except OSError:
+                is_current = False
+            if is_current:
+                break
+            stream.close()
+
+        # locks that are in use must not look expired to `cleanup`
+        with stream:
+            os.utime(filename, None)
+            try:
+                yield
+            finally:
+                fcntl.flock(stream, fcntl.LOCK_UN)
+
+    def _remember(self, key, value, n_bytes):
+        # the size of the pickle is a decent proxy for the memory a value uses
+        if key in self._memory:
+            self._memory_size -= self._memory.pop(key)[1]
+        if n_bytes > self.memory_budget:
+            return
+        self._memory[key] = (value, n_bytes)
+        self._memory_size += n_bytes
+        while self._memory_size > self.memory_budget:
+            _, (_, evicted_bytes) = self._memory.popitem(last=False)
+            self._memory_size -= evicted_bytes
+            self.stats['memory evictions'] += 1
+
+    def is_current(self, filename):
+        """Whether `filename` exists and has not expired"""
+        if not os.path.exists(filename):
+            return False
+        return time.time() - os.path.getmtime(filename) < self.max_age
+
+    def touch(self, filename):
+        """Mark `filename` as recently used. This updates the access time but
+        keeps the modification time, which determines when it expires.
+        """
+        try:
+            os.utime(filename, (time.time(), os.path.getmtime(filename)))
+        except OSError:
+            pass
+
+    def record_read(self, n_bytes):
+        self.stats['bytes read'] += n_bytes
+
+    def record_write(self, n_bytes):
+        self.stats['bytes written'] += n_bytes
+
+    def record_corrupt(self, filename):
+        """Count and remove a corrupt file so that it is computed again"""
+        self.stats['corrupt files'] += 1
+        self._remove(filename)
+
+    def iter_files(self, extensions=CACHE_EXTENSIONS, directories=None):
+        """Iterate over the path, size, access time and modification time of
+        every file in the disk tier, or in `directories`
+        """
+        for directory in directories or self.directories:
+            try:
+                filenames = os.listdir(directory)
+            except OSError:
+                continue
+            for filename in filenames:
+                if os.path.splitext(filename)[1] not in extensions:
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_atime, stat.st_mtime
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def _remove_lock(self, path):
+        """Remove the lock file `path` unless another process holds it"""
+        try:
+            stream = open(path, 'a')
+        except IOError:
+            return False
+        with stream:
+            try:
+                fcntl.flock(stream, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                return False
+            return self._remove(path)
+
+    def cleanup_once(self):
+        """Clean up (see `cleanup`) the first time the disk tier is used by
+        this process
+        """
+        if not self._cleaned_up:
+            self.cleanup()
+
+    def cleanup(self):
+        """Delete the expired files and evict files until the disk tier is
+        within its budget
+        """
+        self._cleaned_up = True
+        now = time.time()
+        extensions = CACHE_EXTENSIONS + (TEMPORARY_EXTENSION,)
+        for path, size, atime, mtime in list(self.iter_files(extensions)):
+            if now - mtime >= self.max_age and self._remove(path):
+                self.stats['expired files'] += 1
+        locks = self.iter_files((LOCK_EXTENSION,), [self.lock_root])
+        for path, size, atime, mtime in list(locks):
+            if now - mtime >= self.max_age and self._remove_lock(path):
+                self.stats['expired files'] += 1
+        self.enforce_disk_budget()
+
+    def enforce_disk_budget(self):
+        files = sorted(self.iter_files(), key=lambda f: f[2])
+        disk_size = sum(size for path, size, atime, mtime in files)
+        for path, size, atime, mtime in files:
+            if disk_size <= self.disk_budget:
+                break
+            if self._remove(path):
+                disk_size -= size
+                self.stats['disk evictions'] += 1
+
+    def format_stats(self):
+        stats = self.stats
+        return (
+            "cache: %d memory hits, %d disk hits, %d misses, "
+            "%d memory evictions, %d disk evictions, %d expired files, "
+            "%d corrupt files, %s read, %s written" % (
+                stats['memory hits'], stats['disk hits'], stats['misses'],
+                stats['memory evictions'], stats['disk evictions'],
+                stats['expired files'], stats['corrupt files'],
+                format_bytes(stats['bytes read']),
+                format_bytes(stats['bytes written']),
+            )
+        )
+
+    def print_stats(self, stream=sys.stderr):
+        print >> stream, self.format_stats()
+
+
+# the cache that is shared by everything in this process
+default_cache = Cache()
@@ -1,47 +1,103 @@
 import ConfigParser
-import random
 import os
+import multiprocessing
 import collections
 import sys
 import json
 import time
 import datetime
+import hashlib
 
 import numpy
 
 from .person import Person
+from .team import Team
+from .solver import Solver
 from . import utils
 from . import reports
-from .decorators import read_or_run
+from . import simulation
+from . import exact
+from . import sensitivity
+from . import store
+from . import cache
+from .parameters import Parameters
+from .simulation import DEFAULT_SEED
+from .decorators import memoize_derived
+
+# the sections of config.ini that affect the results of simulations. notably,
+# this excludes the quickbooks credentials.
+FINGERPRINT_SECTIONS = ('parameters', 'take home pay', 'ownership')
+
+# the reports that the simulations need
+SIMULATION_REPORTS = (
+    'balance_sheet',
+    'unpaid_invoices',
+    'revenue_projections',
+)
+
+
+def _parse_report(report_class):
+    """Parse a report and snapshot its records (see `Report.get_records`).
+    This is a module level function so that it can be pickled for a process
+    pool.
+    """
+    report_class().get_records()
+
+
+def _has_universes(revenues, stop):
+    """Whether a stored batch of `revenues` has the first `stop` universes.
+    Batches are whole blocks of universes (see `Datascope.get_revenues`).
+    """
+    return (
+        revenues is not None and len(revenues) >= stop and
+        len(revenues) % simulation.BLOCK_SIZE == 0
+    )
+
+
+class LazyReport(object):
+    """Financial information from the quickbooks cache that is only loaded
+    the first time it is used
+    """
+
+    def __init__(self, report_class):
+        self.report_class = report_class
+
+    def __get__(self, datascope, owner=None):
+        if datascope is None:
+            return self
+        loaded_reports = datascope._reports
+        if self.report_class not in loaded_reports:
+            loaded_reports[self.report_class] = self.report_class()
+        return loaded_reports[self.report_class]
 
 
 class Datascope(object):
 
-    def __init__(self):
+    profit_loss = LazyReport(reports.ProfitLoss)
+    ar_aging = LazyReport(reports.ARAging)
+    balance_sheet = LazyReport(reports.BalanceSheet)
+    unpaid_invoices = LazyReport(reports.UnpaidInvoices)
+    revenue_projections = LazyReport(reports.RevenueProjections)
 
-        # instantiate the config object from the ini file
-        config_filename = os.path.join(utils.DROPBOX_ROOT, 'config.ini')
-        self.config = ConfigParser.ConfigParser()
-        self.config.read(config_filename)
+    def __init__(self, prefetch=False):
 
-        # iterate over the config to instantiate each person
-        self.people = []
-        for name, _ in self.config.items('take home pay'):
-            self.add_person(name)
+        # instantiate the config object from the ini file and each person in it
+        self.reload_config()
 
         # make sure the data_root exists
-        if not os.path.exists(utils.DATA_ROOT):
-            os.mkdir(utils.DATA_ROOT)
+        cache.makedirs(utils.DATA_ROOT)
 
-        # update financial information from quickbooks cache
-        self.profit_loss = reports.ProfitLoss()
-        self.ar_aging = reports.ARAging()
-        self.balance_sheet = reports.BalanceSheet()
-        self.unpaid_invoices = reports.UnpaidInvoices()
-        self.revenue_projections = reports.RevenueProjections()
+        # financial information from the quickbooks cache is loaded the first
+        # time it is used, unless we know we'll need it anyway
+        self._reports = {}
+        if prefetch is True:
+            self.prefetch_reports()
+        elif prefetch:
+            self.prefetch_reports(prefetch)
 
         # variables for caching parameters here
         self._monthly_cash = None
+        self.result_store = store.ResultStore()
 
     def __iter__(self):
         for person in self.people:
@@ -51,22 +107,59 @@ class Datascope(object):
         return len(self.people)
 
     def __getattr__(self, name):
-        """This just accesses the value from the config.ini directly"""
-        return self.config.getfloat('parameters', name)
+        """This accesses the value from the compiled config.ini parameters,
+        falling back on reading config.ini directly for any other parameters
+        """
+        if name.startswith('_') or name in ('config', 'parameters'):
+            raise AttributeError(name)
+        try:
+            return getattr(self.parameters, name)
+        except AttributeError:
+            return self.config.getfloat('parameters', name)
+
+    def reload_config(self):
+        """Read config.ini and instantiate each person in it"""
+        config_filename = os.path.join(utils.DROPBOX_ROOT, 'config.ini')
+        self.config = ConfigParser.ConfigParser()
+        self.config.read(config_filename)
+        self.compile()
+
+        # iterate over the config to instantiate each person
+        self.people = []
+        for name, _ in self.config.items('take home pay'):
+            self.add_person(name)
+
+    def compile(self):
+        """Parse the parameters in config.ini into an immutable snapshot and
+        forget everything that has been derived from them so far. This needs
+        to be called after changing `self.config` directly.
+        """
+        self.parameters = Parameters(self.config)
+        self._derived = {}
 
     def add_person(self, name):
         person = Person(self, name)
         self.people.append(person)
+
+        # costs, target profits, etc all depend on who is at datascope
+        self._derived = {}
         return person
 
+    def get_team(self):
+        """Get everyone at datascope as an array-backed `team.Team`"""
+        return Team.from_datascope(self)
+
     @property
+    @memoize_derived
     def n_people(self):
         return len([person for person in self if person.is_active])
 
     @property
+    @memoize_derived
     def n_partners(self):
         return len([person for person in self if person.is_partner])
 
+    @memoize_derived
     def after_tax_target_profit(self):
         """Based on everyone's personal take-home pay goals in config.ini,
         determine the target profit for datascope after taxes
@@ -104,6 +197,7 @@ class Datascope(object):
         """
         return self.costs() + self.before_tax_profit()
 
+    @memoize_derived
     def costs(self):
         """Estimate rough monthly costs for Datascope"""
         return self.fixed_monthly_costs + \
@@ -126,6 +220,56 @@ class Datascope(object):
         yearly_billable_hours = self.billable_hours_per_year * self.n_people
         return yearly_revenue / yearly_billable_hours
 
+    def get_fingerprint(self):
+        """Fingerprint of everything that the simulations depend on: the
+        reports from quickbooks that they use (see `SIMULATION_REPORTS`), the
+        config.ini sections that matter, the people at datascope and the
+        current month. This is used as part of the
+        key for cached results (see `decorators.read_or_run`). It is not
+        memoized, so that syncing the reports changes it right away, and the
+        reports are only hashed again when they change (see
+        `utils.file_fingerprint`).
+        """
+        m = hashlib.sha1()
+        for name in SIMULATION_REPORTS:
+            m.update(utils.file_fingerprint(getattr(self, name).filename))
+        for section in FINGERPRINT_SECTIONS:
+            if self.config.has_section(section):
+                m.update(repr(sorted(self.config.items(section))))
+        m.update(repr([person.name for person in self]))
+        m.update(str(utils.end_of_last_month()))
+        return m.hexdigest()
+
+    def prefetch_reports(self, names=SIMULATION_REPORTS):
+        """Load the reports called `names` ahead of time. Reports that have
+        to be parsed from xlsx (rather than loaded from a snapshot) are parsed
+        in parallel in a pool of processes, so this takes about as long as
+        the slowest report instead of all of them put together.
+        """
+        unparsed = []
+        for name in names:
+            report = getattr(self, name)
+            if not os.path.exists(report.snapshot_filename):
+                unparsed.append(report)
+        if len(unparsed) > 1:
+            pool = multiprocessing.Pool(len(unparsed))
+            try:
+                pool.map(_parse_report, [type(report) for report in unparsed])
+            finally:
+                pool.close()
+                pool.join()
+
+        # everything has a snapshot now
+        for name in names:
+            getattr(self, name).get_records()
+
+    def iter_reports(self):
+        yield self.profit_loss
+        yield self.ar_aging
+        yield self.balance_sheet
+        yield self.unpaid_invoices
+        yield self.revenue_projections
+
     def iter_future_months(self, n_months):
         # can use any report for this. happened to choose unpaid invoices
         for month in range(1, n_months+1):
@@ -135,56 +279,17 @@ class Datascope(object):
         # can use any report for this. happened to choose unpaid invoices
         return self.unpaid_invoices.get_months_from_now(date)
 
-    @read_or_run
-    def simulate_revenues(self, universe, n_months):
+    def simulate_revenues(self, universe, n_months, seed=DEFAULT_SEED):
         """
-        Simulate revenues from accounts receivable data.
+        Simulate revenues from accounts receivable data in a single
+        `universe`. This is a row of the batch of universes from
+        `get_revenues`, so it does not simulate or store anything on its own.
         """
-        # TODO: Add in revenue from the 'Finalize (SOW/Legal)' Trello list
-        # TODO: add in revenue from the 'Proposal Process' Trello list
-        # TODO: do some analysis to come up with a good delta_months parameter
-
-        revenues = [0.0] * n_months
-
-        def ontime_noise():
-            """Clients rarely pay early and tend to pay late"""
-            # TODO: can measure this and make it a not crappy model
-            return random.randint(0, 3)
-
-        def work_completion_noise():
-            """The end of projects can sometimes drag on a bit, delaying
-            payment.
-            """
-            # TODO: could probably measure this from project planning doodie
-            return random.randint(0, 2)
-
-        # revenue from accounts receiveable is, all things considered,
-        # extremely certain. The biggest question here is whether people will
-        # pay on time.
-        for date, balance in self.unpaid_invoices:
-            months_from_now = self._get_months_from_now(date)
-
-            # we are presumably actively bugging people about overdue invoices,
-            # so these should be paid relatively soon
-            months_from_now = max(0, months_from_now)
-
-            # add this balance to the revenues if the revenue hits in the
-            # simulation time window
-            month = months_from_now + ontime_noise()
-            if month < n_months:
-                revenues[month] += balance
-
-        # revenue from projects in progress is also relatively certain. There
-        # are two sources of variability: (i) whether the work is deemed done
-        # in time to receive payment by the specified date and (ii) whether our
-        # clients pay on time.
-        for date, balance in self.revenue_projections:
-            months_from_now = self._get_months_from_now(date)
-            month = months_from_now + work_completion_noise() + ontime_noise()
-            if month < n_months:
-                revenues[month] += balance
-
-        return revenues
+        block, row = divmod(universe, simulation.BLOCK_SIZE)
+        revenues = self.get_revenues(
+            n_months, simulation.BLOCK_SIZE, seed, first_block=block,
+        )
+        return list(revenues[row])
 
 # #    @run_or_cache
 #     def simulate_costs(self, universe, n_months, n_people):
@@ -220,12 +325,11 @@ class Datascope(object):
 #
 #         return costs
 
-    def _simulate_single_universe_monthly_cash(self, universe, n_months):
+    def _simulate_single_universe_monthly_cash(self, revenues):
         cash = self.balance_sheet.get_current_cash_in_bank()
-        revenues = self.simulate_revenues(universe, n_months)
         # costs = self.simulate_costs(universe, n_months, self.n_people())
         monthly_cash = []
-        for month in range(n_months):
+        for month in range(len(revenues)):
             cash -= self.costs()
             if cash < -self.line_of_credit:
                 break
@@ -234,47 +338,347 @@ class Datascope(object):
         return monthly_cash
 
     def simulate_monthly_cash(self, n_months=12, n_universes=1000,
-                              verbose=False):
+                              verbose=False, seed=DEFAULT_SEED):
         """Simulate finances and the cash in the bank at the end of every
-        month.
+        month. The default `seed` gives the same universes from script to
+        script.
         """
+        revenues = self.get_revenues(n_months, n_universes, seed)
         monthly_cash_outputs = []
         for universe in range(n_universes):
             if verbose and universe % 100 == 0:
                 print >> sys.stderr, "simulation %d" % universe
             monthly_cash_outputs.append(
-                self._simulate_single_universe_monthly_cash(universe, n_months)
+                self._simulate_single_universe_monthly_cash(revenues[universe])
             )
         return monthly_cash_outputs
 
+    @memoize_derived
+    def get_scheduled_payments(self):
+        """Get the unpaid invoices and revenue projections as the tuple of
+        arrays that the simulation engines in `a_model.simulation` expect
+        """
+        invoice_months, invoice_balances = \
+            self.unpaid_invoices.get_payments()
+        projection_months, projection_balances = \
+            self.revenue_projections.get_payments()
+        return (
+            invoice_months, invoice_balances,
+            projection_months, projection_balances,
+        )
+
+    def get_revenues(self, n_months, n_universes, seed, n_workers=1,
+                     first_block=0):
+        """Get the (n_universes x n_months) simulated revenues in the
+        universes from block `first_block` onwards (see
+        `simulation.simulate_revenues_in_blocks`). Every batch of revenues is
+        kept in the `result_store`, so only the blocks that have never been
+        simulated for these scheduled payments, `seed` and `n_months` are
+        simulated and the rest are memory-mapped from disk.
+        """
+        payments = self.get_scheduled_payments()
+        input_fingerprint = store.get_payments_fingerprint(payments)
+        start = first_block * simulation.BLOCK_SIZE
+        stop = start + n_universes
+        stored = self.result_store.load(input_fingerprint, seed, n_months)
+        if _has_universes(stored, stop):
+            return stored[start:stop]
+
+        # only one process simulates the missing universes at a time. the
+        # others wait and then use what it stored.
+        with self.result_store.lock(input_fingerprint, seed, n_months):
+            return self._extend_revenues(
+                payments, input_fingerprint, n_months, seed, n_workers,
+                start, stop,
+            )
+
+    def _extend_revenues(self, payments, input_fingerprint, n_months, seed,
+                         n_workers, start, stop):
+        stored = self.result_store.load(
+            input_fingerprint, seed, n_months, count_miss=False,
+        )
+        if _has_universes(stored, stop):
+            return stored[start:stop]
+
+        # the draws of a partial block are not the first universes of the
+        # whole block, so only whole blocks are ever simulated and stored.
+        # the whole blocks that are already stored are kept as they are.
+        n_blocks = 0
+        if stored is not None:
+            n_blocks = len(stored) // simulation.BLOCK_SIZE
+        n_stored = n_blocks * simulation.BLOCK_SIZE
+        n_total = stop + -stop % simulation.BLOCK_SIZE
+        revenues = simulation.simulate_revenues_in_blocks(
+            payments, n_months, n_total - n_stored, seed, n_workers=n_workers,
+            first_block=n_blocks,
+        )
+        if n_stored:
+            revenues = numpy.vstack([stored[:n_stored], revenues])
+        self.result_store.save(input_fingerprint, seed, n_months, revenues)
+        return revenues[start:stop]
+
+    def simulate_monthly_cash_array(self, n_months=12, n_universes=1000,
+                                    seed=DEFAULT_SEED, n_workers=1,
+                                    tolerance=None, cash_tolerance=None,
+                                    confidence=0.95, max_seconds=None,
+                                    costs=None, verbose=False):
+        """Simulate finances and the cash in the bank at the end of every
+        month for all universes at once. This returns an (n_universes x
+        n_months) array; months after a universe has run out of credit are NaN.
+
+        The universes are sharded across `n_workers` processes (all cores if
+        `n_workers` is None). For a given `seed`, the results are identical
+        regardless of the number of workers, and the default `seed` gives the
+        same universes from run to run, so they are loaded from the
+        `result_store` until the inputs change.
+
+        If a `tolerance` is specified, universes are simulated in batches
+        until the `confidence` intervals on the outcome probabilities are
+        within `tolerance` and the intervals on the median cash are within
+        `cash_tolerance` (a tenth of a month of costs by default) in every
+        month. `n_universes` and `max_seconds` then cap how long this goes on.
+
+        `costs` are either the monthly costs or the costs in each month
+        (current costs by default).
+
+        To get the distribution of the cash without sampling any universes,
+        see `get_cash_distribution`.
+        """
+        if verbose:
+            print >> sys.stderr, "simulating with seed %d" % seed
+        if tolerance is not None:
+            return self._simulate_monthly_cash_adaptively(
+                n_months, n_universes, seed, n_workers, tolerance,
+                cash_tolerance, confidence, max_seconds, costs, verbose,
+            )
+        revenues = self.get_revenues(
+            n_months, n_universes, seed, n_workers=n_workers,
+        )
+        return self._get_monthly_cash(revenues, costs)
+
+    def _get_monthly_cash(self, revenues, costs=None):
+        if costs is None:
+            costs = self.costs()
+        return simulation.simulate_monthly_cash(
+            revenues,
+            self.balance_sheet.get_current_cash_in_bank(),
+            costs,
+            self.line_of_credit,
+        )
+
+    def _simulate_monthly_cash_adaptively(self, n_months, max_universes,
+                                          seed, n_workers, tolerance,
+                                          cash_tolerance, confidence,
+                                          max_seconds, costs, verbose):
+        if cash_tolerance is None:
+            cash_tolerance = self.costs() / 10
+        z = simulation.z_score(confidence)
+        thresholds = self.get_outcome_thresholds(range(n_months))
+        start_time = time.time()
+        monthly_cash = numpy.zeros((0, n_months))
+        counts = numpy.zeros((n_months, len(simulation.OUTCOMES)))
+        while len(monthly_cash) < max_universes:
+
+            # grow the batches as we go so that we don't spend all our time
+            # checking for convergence. batches are whole blocks so that the
+            # universes are the same as they would have been in one go
+            n_universes = len(monthly_cash)
+            batch_size = max(simulation.MIN_BATCH_SIZE, n_universes // 4)
+            batch_size += -batch_size % simulation.BLOCK_SIZE
+            batch_size = min(batch_size, max_universes - n_universes)
+            revenues = self.get_revenues(
+                n_months, batch_size, seed, n_workers=n_workers,
+                first_block=n_universes // simulation.BLOCK_SIZE,
+            )
+            batch = self._get_monthly_cash(revenues, costs)
+            monthly_cash = numpy.vstack([monthly_cash, batch])
+            counts += simulation.count_outcomes(
+                simulation.classify_outcomes(batch, thresholds)
+            )
+
+            # stop once all of the confidence intervals are tight enough
+            n_universes = len(monthly_cash)
+            probability_error = simulation.proportion_half_widths(
+                counts / n_universes, n_universes, z,
+            ).max()
+            cash_errors = simulation.median_half_widths(monthly_cash, z)
+            maybe_bankrupt = numpy.isnan(cash_errors)
+            cash_error = 0.0
+            if not maybe_bankrupt.all():
+                cash_error = cash_errors[~maybe_bankrupt].max()
+            if verbose:
+                message = (
+                    "%d universes: outcome probabilities +/- %.3f, median "
+                    "cash +/- %.0f" % (n_universes, probability_error,
+                                       cash_error)
+                )
+                if maybe_bankrupt.any():
+                    message += (
+                        " (the median may be bankrupt in %d months)" %
+                        maybe_bankrupt.sum()
+                    )
+                print >> sys.stderr, message
+            if probability_error <= tolerance and cash_error <= cash_tolerance:
+                break
+            if max_seconds and time.time() - start_time > max_seconds:
+                break
+        return monthly_cash
+
+    def get_hiring_costs(self, n_months, start_months):
+        """Get the (n_hires+1 x n_months) costs in each month after hiring
+        0, 1, ..., n_hires new people, where each new hire starts
+        `start_months[i]` months from now
+        """
+        months = numpy.arange(n_months)
+        n_hired = numpy.zeros((len(start_months) + 1, n_months))
+        for hire, start_month in enumerate(start_months):
+            n_hired[hire+1:] += months >= start_month
+        return self.costs() + self.per_datascoper_costs * n_hired
+
+    def simulate_hiring_sweep(self, n_months=12, start_months=(),
+                              n_universes=1000, seed=DEFAULT_SEED,
+                              n_workers=1, verbose=False):
+        """Simulate the cash in the bank at the end of every month after
+        hiring 0, 1, ..., len(start_months) new people, where each new hire
+        starts `start_months[i]` months from now. Revenues do not depend on
+        headcount, so every headcount is simulated against the very same
+        revenues to make sure the differences between headcounts are real and
+        not sampling noise. This returns an (n_hires+1 x n_universes x
+        n_months) array.
+        """
+        if verbose:
+            print >> sys.stderr, "simulating with seed %d" % seed
+        revenues = self.get_revenues(
+            n_months, n_universes, seed, n_workers=n_workers,
+        )
+        cash_in_bank = self.balance_sheet.get_current_cash_in_bank()
+        return numpy.array([
+            simulation.simulate_monthly_cash(
+                revenues, cash_in_bank, costs, self.line_of_credit,
+            )
+            for costs in self.get_hiring_costs(n_months, start_months)
+        ])
+
+    def get_solver(self, month=None, n_universes=1000, seed=DEFAULT_SEED,
+                   n_workers=1, verbose=False):
+        """Get a `solver.Solver` to search for the most people we can hire,
+        etc, while meeting risk constraints through `month` months from now
+        """
+        if verbose:
+            print >> sys.stderr, "simulating with seed %d" % seed
+        return Solver(
+            self, month=month, n_universes=n_universes, seed=seed,
+            n_workers=n_workers,
+        )
+
+    def get_cash_distribution(self, n_months=12, costs=None):
+        """Calculate the distribution of the cash in the bank at the end of
+        every month without sampling any universes (see `exact`). `costs` are
+        either the monthly costs or the costs in each month (current costs by
+        default).
+        """
+        if costs is None:
+            costs = self.costs()
+        return exact.CashDistribution(
+            self.get_scheduled_payments(),
+            n_months,
+            self.balance_sheet.get_current_cash_in_bank(),
+            costs,
+            self.line_of_credit,
+        )
+
+    def get_exact_outcome_table(self, n_months=12, costs=None):
+        """Sampling-free counterpart of `get_outcome_table`, computed from the
+        distribution of the cash in the bank in every month
+        """
+        cash_distribution = self.get_cash_distribution(n_months, costs)
+        return cash_distribution.get_outcome_probabilities(
+            self.get_outcome_thresholds(range(n_months)),
+        )
+
     def get_cash_goal_in_month(self, month):
         """calculate the cash we want to have in the bank in `month` months
         from now
         """
         cash_goal = self.n_months_buffer * self.costs()
-        date = utils.date_in_n_months(month)
-        cash_goal += date.month * self.after_tax_target_profit()
+        cash_goal += self.get_bonus_goal_in_month(month)
         return cash_goal
 
-    def get_outcomes_in_month(self, month, monthly_cash_outcomes):
-        cash_goal = self.get_cash_goal_in_month(month)
-        keys = ['goal', 'buffer', 'no bonus', 'squeak by', 'bye bye']
-        outcomes = collections.OrderedDict.fromkeys(keys, 0.0)
+    def get_bonus_goal_in_month(self, month):
+        """calculate the cash we want to have in the bank on top of our buffer
+        in `month` months from now to pay out bonuses and dividends
+        """
+        date = utils.date_in_n_months(month)
+        return date.month * self.after_tax_target_profit()
+
+    def get_end_of_year_month(self):
+        """the month of the simulation that ends at the end of this year"""
+        eoy = datetime.date(datetime.date.today().year, 12, 31)
+        return self._get_months_from_now(eoy) - 1
+
+    def get_parameter_sensitivity(self, ranges, month=None, n_universes=1000,
+                                  seed=DEFAULT_SEED, n_workers=1,
+                                  verbose=False):
+        """Evaluate the outcomes in `month` months from now (the end of the
+        year by default) for every combination of the parameter values in
+        `ranges`, an ordered mapping of the names of the parameters in
+        `sensitivity.PARAMETERS` to the values to try. The whole grid shares
+        one set of simulated revenues. Returns the grid (see
+        `sensitivity.get_grid`), the (n_points x n_outcomes) probability of
+        each outcome and the median cash at each point in the grid.
+        """
+        if month is None:
+            month = self.get_end_of_year_month()
+        if verbose:
+            print >> sys.stderr, "simulating with seed %d" % seed
+        revenues = self.get_revenues(
+            month + 1, n_universes, seed, n_workers=n_workers,
+        )
+        grid = sensitivity.get_grid(ranges)
+        parameters = dict(
+            (name, getattr(self, name)) for name in sensitivity.PARAMETERS
+        )
+        outcomes, median_cash = sensitivity.evaluate_grid(
+            revenues,
+            self.balance_sheet.get_current_cash_in_bank(),
+            self.n_people,
+            self.get_bonus_goal_in_month(month),
+            parameters,
+            grid,
+        )
+        return grid, outcomes, median_cash
+
+    def get_outcome_thresholds(self, months):
+        """Get the sorted cash thresholds between the outcomes for each of
+        `months` as a (len(months) x 4) array
+        """
         cash_buffer = self.n_months_buffer * self.costs()
-        for monthly_cash in monthly_cash_outcomes:
-            cash = monthly_cash[month]
-            if cash > cash_goal:
-                outcomes['goal'] += 1
-            elif cash > cash_buffer:
-                outcomes['buffer'] += 1
-            elif cash > 0:
-                outcomes['no bonus'] += 1
-            elif cash > -self.line_of_credit:
-                outcomes['squeak by'] += 1
-            else:
-                outcomes['bye bye'] += 1
-        norm = sum(outcomes.values())
-        if norm > 0:
-            for k, v in outcomes.iteritems():
-                outcomes[k] = float(v) / norm
-        return outcomes
+        return numpy.array([
+            [-self.line_of_credit, 0.0, cash_buffer,
+             self.get_cash_goal_in_month(month)]
+            for month in months
+        ])
+
+    def get_outcome_table(self, monthly_cash_outcomes):
+        """Classify every month of every universe into the outcomes in
+        `simulation.OUTCOMES` in one pass. Returns an (n_months x n_outcomes)
+        array of the probability of each outcome in each month.
+        """
+        monthly_cash = simulation.as_monthly_cash_array(monthly_cash_outcomes)
+        n_months = monthly_cash.shape[1]
+        outcomes = simulation.classify_outcomes(
+            monthly_cash, self.get_outcome_thresholds(range(n_months)),
+        )
+        return simulation.get_outcome_probabilities(outcomes)
+
+    def get_outcomes_in_month(self, month, monthly_cash_outcomes):
+        monthly_cash = simulation.as_monthly_cash_array(
+            monthly_cash_outcomes, n_months=month+1,
+        )
+        outcomes = simulation.classify_outcomes(
+            monthly_cash[:, [month]], self.get_outcome_thresholds([month]),
+        )
+        probabilities = simulation.get_outcome_probabilities(outcomes)
+        return collections.OrderedDict(
+            zip(simulation.OUTCOMES, probabilities[0])
+        )
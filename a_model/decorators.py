@@ -1,60 +1,129 @@
 from functools import wraps
-import cPickle as pickle
 import os
-import time
-import md5
+import hashlib
+import inspect
+import argparse
 
-from . import utils
+import numpy
+
+from . import cache
+
+# the directory of the a_model package
+PACKAGE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# source versions by path (see `source_version`)
+_source_versions = {}
+
+
+def fingerprint(obj):
+    """Get a fingerprint of `obj` that only depends on its content and not on
+    where it lives in memory. Objects can describe the inputs that matter by
+    defining a `get_fingerprint` method; otherwise, their repr is used.
+    """
+    get_fingerprint = getattr(type(obj), 'get_fingerprint', None)
+    if get_fingerprint is not None:
+        return get_fingerprint(obj)
+    elif isinstance(obj, argparse.Namespace):
+        return fingerprint(sorted(vars(obj).items()))
+    elif isinstance(obj, (list, tuple)):
+        return '(%s)' % ','.join(fingerprint(item) for item in obj)
+    elif isinstance(obj, dict):
+        return fingerprint(sorted(obj.items()))
+    elif isinstance(obj, numpy.ndarray):
+        m = hashlib.sha1(numpy.ascontiguousarray(obj).tobytes())
+        return 'array(%s,%s,%s)' % (obj.dtype, obj.shape, m.hexdigest())
+    return repr(obj)
+
+
+def code_version(method):
+    """Get a hash of the source code of `method` so that cached results are
+    forgotten whenever the code that produced them changes
+    """
+    try:
+        source = inspect.getsource(method)
+    except (IOError, TypeError):
+        source = method.func_code.co_code
+    return hashlib.sha1(source).hexdigest()
+
+
+def source_version(*paths):
+    """Get a hash of the source code of the python modules at `paths`, where a
+    directory stands for every module in it. The hash is only computed once
+    for each set of paths.
+    """
+    if paths not in _source_versions:
+        m = hashlib.sha1()
+        for path in paths:
+
+            # modules that were imported from bytecode
+            if path.endswith('.pyc'):
+                path = path[:-1]
+            filenames = [path]
+            if os.path.isdir(path):
+                filenames = sorted(
+                    os.path.join(dirpath, filename)
+                    for dirpath, dirnames, filenames in os.walk(path)
+                    for filename in filenames if filename.endswith('.py')
+                )
+            for filename in filenames:
+                m.update(os.path.relpath(filename, PACKAGE_ROOT))
+                with open(filename, 'rb') as stream:
+                    m.update(stream.read())
+        _source_versions[paths] = m.hexdigest()
+    return _source_versions[paths]
 
 
 def read_or_run(method):
     """This decorator is useful for caching results from random trials to keep
     results consistent from script to script. This stores the result on disk
-    and keeps it in memory after it is read from disk.
-    """
-
-    # TODO: cache results based on when "today" actually is
+    and keeps it in memory after it is read from disk (see `cache.Cache`).
 
-    # this is a global cache that avoids re-reading data from disk when its
-    # already been read from disk
-    _cache = {}
+    The cache is content-addressed: the key is derived from the method's
+    source code and the fingerprints of its arguments (see `fingerprint`),
+    rather than from where the arguments happen to live in memory. Methods
+    call into the simulations and everything else in the package, so the
+    key also includes the source code of the whole package.
+    """
+    version = code_version(method)
 
     @wraps(method)
     def wrapped_method(*args, **kwargs):
 
-        # use the method and call signature to cache the result in memory
-        m = md5.new()
+        # use the method and call signature to find the result in the cache
+        m = hashlib.sha1(version)
+        m.update(source_version(PACKAGE_ROOT))
         for arg in args:
-            m.update(str(arg))
+            m.update(fingerprint(arg))
         for k, v in sorted(kwargs.iteritems()):
             m.update(str(k))
-            m.update(str(v))
+            m.update(fingerprint(v))
         cache_key = method.func_name + '-' + m.hexdigest()
 
-        # cache result in memory to avoid rereading from disk
-        if cache_key in _cache:
-            return _cache[cache_key]
-
-        # load the data from cache, if possible
-        cache_filename = os.path.join(
-            utils.DATA_ROOT, cache_key + '.pkl',
+        # otherwise, run the method and cache the result
+        return cache.default_cache.get_or_run(
+            cache_key, method, *args, **kwargs
         )
-        result = None
-        if os.path.exists(cache_filename):
-            age = time.time() - os.path.getmtime(cache_filename)
-            if age < utils.MAX_CACHE_AGE:
-                with open(cache_filename) as stream:
-                    result = pickle.load(stream)
 
-        # otherwise, run the method and cache the result
-        if result is None:
-            result = method(*args, **kwargs)
-            with open(cache_filename, 'w') as stream:
-                pickle.dump(result, stream)
-
-        # remember this result in memory to avoid re-running or reading from
-        # disk again
-        _cache[cache_key] = result
-        return result
+    return wrapped_method
+
+
+def memoize_derived(method):
+    """This decorator memoizes quantities that are derived from the compiled
+    parameters in config.ini, like costs or target profits. The memoized
+    values live on the `Datascope` (the instance itself or its `datascope`
+    attribute) and are forgotten whenever the datascope is recompiled.
+    """
+
+    @wraps(method)
+    def wrapped_method(self):
+        if 'datascope' in vars(self):
+            datascope = self.datascope
+            cache_key = (method.func_name, self.name)
+        else:
+            datascope, cache_key = self, (method.func_name, None)
+        derived = datascope._derived
+        if cache_key not in derived:
+            derived[cache_key] = method(self)
+        return derived[cache_key]
 
     return wrapped_method
@@ -0,0 +1,250 @@
+"""Sampling-free engine for Datascope's finances. The only randomness in the
+simulation is the small, discrete delay of each payment, so the distribution
+of the revenue that arrives before and during each month is a convolution of
+the independent distributions of each payment (arrived earlier, arrives this
+month or not yet). This computes those distributions on a binned cash grid
+instead of sampling universes.
+
+Like the Monte Carlo engine, a universe goes bust as soon as it is beyond the
+line of credit after paying the bills and before that month's revenue
+arrives, and it stays bust. The distribution of the cash in the universes
+that are still solvent is carried forward one month at a time, with the
+revenue in each month drawn from its exact distribution given the revenue
+that arrived before it. That makes the distribution of the cash in every month
+exact, but the chance of going bust is only exact as far as the revenue in
+one month says everything about which payments are still to come. It is not
+quite, since a payment only ever arrives once, but that leaves much less of a
+gap than sampling 1000 universes.
+"""
+
+import fractions
+
+import numpy
+
+from . import simulation
+
+# the cash grid has roughly this many bins unless all of the payments fit on a
+# coarser grid exactly, so this sets the resolution of the distributions
+N_BINS = 2000
+
+# probabilities below this are round-off from convolving with FFTs
+ROUNDOFF = 1e-14
+
+# probability of each number of months of delay from each source of noise
+ONTIME_PMF = numpy.ones(simulation.MAX_ONTIME_NOISE + 1)
+ONTIME_PMF /= ONTIME_PMF.sum()
+WORK_COMPLETION_PMF = numpy.ones(simulation.MAX_WORK_COMPLETION_NOISE + 1)
+WORK_COMPLETION_PMF /= WORK_COMPLETION_PMF.sum()
+PROJECTION_PMF = numpy.convolve(WORK_COMPLETION_PMF, ONTIME_PMF)
+
+
+def get_arrival_pmfs(months, delay_pmf, n_months):
+    """Calculate the (n_payments x n_months) probability that each payment
+    that is due `months` months from now arrives in each month, given the
+    distribution of its delay `delay_pmf`
+    """
+    months = numpy.asarray(months, int)
+    payments = numpy.arange(len(months))
+    pmf = numpy.zeros((len(months), n_months))
+    for delay, probability in enumerate(delay_pmf):
+        arrival = months + delay
+        in_window = (arrival >= 0) & (arrival < n_months)
+        pmf[payments[in_window], arrival[in_window]] += probability
+    return pmf
+
+
+def get_bin_size(balances, n_bins=N_BINS):
+    """Get the largest bin size that all of the `balances` are multiples of
+    (to the cent) as long as the grid has no more than about `n_bins` bins.
+    Otherwise, just split the range of the balances into `n_bins` bins.
+    """
+    cents = numpy.rint(numpy.abs(balances) * 100).astype(int)
+    total = cents.sum()
+    common = reduce(fractions.gcd, cents[cents > 0], 0)
+    if common > 0 and total / common <= n_bins:
+        return common / 100.0
+    return max(0.01, total / 100.0 / n_bins)
+
+
+def _shift_add(probabilities, mass, shift, axis=-1):
+    """Add the `mass` to `probabilities`, shifted by `shift` bins along
+    `axis`
+    """
+    probabilities = numpy.swapaxes(probabilities, axis, -1)
+    mass = numpy.swapaxes(mass, axis, -1)
+    if shift > 0:
+        probabilities[..., shift:] += mass[..., :-shift]
+    elif shift < 0:
+        probabilities[..., :shift] += mass[..., -shift:]
+    else:
+        probabilities += mass
+
+
+class _Grid(object):
+    """Bins of revenue for payments that are each `shifts` bins (or one more
+    bin), so the revenue from any of them fits between `lowest` and
+    `lowest + n_bins - 1` bins
+    """
+
+    def __init__(self, shifts):
+        self.lowest = shifts[shifts < 0].sum()
+        self.n_bins = numpy.abs(shifts).sum() + len(shifts) + 1
+
+    @property
+    def zero(self):
+        return -self.lowest
+
+
+class CashDistribution(object):
+    """The distribution of the cash in the bank at the end of each month.
+    `values` and `probabilities` are (n_months x n_bins) arrays of the cash in
+    each bin of the grid and the probability of being solvent with that cash
+    in each month. `bankrupt` is the probability of having run out of credit
+    by each month, which is the rest of the probability.
+    """
+
+    def __init__(self, payments, n_months, cash_in_bank, costs,
+                 line_of_credit, n_bins=N_BINS):
+        invoice_months, invoice_balances, projection_months, \
+            projection_balances = payments
+
+        # we are presumably actively bugging people about overdue invoices, so
+        # these are treated as due now, just like in the simulation
+        invoice_months = numpy.maximum(0, numpy.asarray(invoice_months, int))
+        balances = numpy.concatenate([
+            numpy.asarray(invoice_balances, float),
+            numpy.asarray(projection_balances, float),
+        ])
+        pmfs = numpy.vstack([
+            get_arrival_pmfs(invoice_months, ONTIME_PMF, n_months),
+            get_arrival_pmfs(projection_months, PROJECTION_PMF, n_months),
+        ])
+        cdfs = numpy.cumsum(pmfs, axis=1) - pmfs
+
+        # put all of the payments onto the cash grid. If the payments are all
+        # multiples of a common amount that fits on the grid (e.g., round
+        # thousands of dollars), the grid is exact. Otherwise, each payment is
+        # split between its two neighboring bins to preserve its mean.
+        self.bin_size = get_bin_size(balances, n_bins)
+        steps = numpy.round(balances / self.bin_size, 6)
+        self.shifts = numpy.floor(steps).astype(int)
+        self.fractions = steps - self.shifts
+        self.grid = _Grid(self.shifts)
+
+        # carry the revenue that arrived so far in the universes that are
+        # still solvent forward from one month to the next
+        revenues = (
+            numpy.arange(self.grid.n_bins) + self.grid.lowest
+        ) * self.bin_size
+        spent = numpy.cumsum(numpy.ones(n_months) * costs)
+        solvent = numpy.zeros(self.grid.n_bins)
+        solvent[self.grid.zero] = 1.0
+        self.probabilities = numpy.zeros((n_months, self.grid.n_bins))
+        self.bankrupt = numpy.zeros(n_months)
+        bankrupt = 0.0
+        for month in range(n_months):
+
+            # we go bust if we are beyond our line of credit after paying the
+            # bills and before any revenue arrives that month
+            bust = cash_in_bank - spent[month] + revenues < -line_of_credit
+            bankrupt += solvent[bust].sum()
+            solvent[bust] = 0.0
+
+            solvent = self._add_revenue(
+                solvent, cdfs[:, month], pmfs[:, month],
+            )
+            self.probabilities[month] = solvent
+            self.bankrupt[month] = bankrupt
+        self.values = cash_in_bank - spent[:, numpy.newaxis] + revenues
+
+    def _add_payments(self, probabilities, payments, probabilities_by_axis):
+        """Convolve the `probabilities` with the distribution of each of the
+        `payments`, which arrives in the revenue along each axis with the
+        probabilities in `probabilities_by_axis` (or not at all)
+        """
+        for payment in payments:
+            shift = self.shifts[payment]
+            fraction = self.fractions[payment]
+            not_arrived = 1.0
+            total = numpy.zeros_like(probabilities)
+            for axis, arrival in enumerate(probabilities_by_axis):
+                p = arrival[payment]
+                not_arrived -= p
+                _shift_add(total, probabilities * p * (1 - fraction), shift,
+                           axis)
+                if fraction > 0:
+                    _shift_add(total, probabilities * p * fraction, shift + 1,
+                               axis)
+            total += probabilities * not_arrived
+            probabilities = total
+        return probabilities
+
+    def _add_revenue(self, solvent, before, during):
+        """Get the distribution of the revenue by the end of a month in the
+        `solvent` universes, given the probability that each payment arrived
+        `before` that month and that it arrives `during` that month
+        """
+        n_bins, zero = self.grid.n_bins, self.grid.zero
+
+        # the joint distribution of the revenue from the payments that may
+        # arrive this month, before this month and during this month
+        arriving = numpy.flatnonzero(during > 0)
+        grid = _Grid(self.shifts[arriving])
+        joint = numpy.zeros((grid.n_bins, grid.n_bins))
+        joint[grid.zero, grid.zero] = 1.0
+        joint = self._add_payments(joint, arriving, (before, during))
+
+        # the rest of the payments can only have arrived before this month
+        others = numpy.flatnonzero(during == 0)
+        revenue = numpy.zeros(n_bins)
+        revenue[zero] = 1.0
+        revenue = self._add_payments(revenue, others, (before,))
+
+        # all together, this is the joint distribution of the revenue before
+        # and during this month on the whole grid
+        size = 2 ** int(numpy.ceil(numpy.log2(n_bins + grid.n_bins - 1)))
+        joint = numpy.fft.irfft(
+            numpy.fft.rfft(revenue, size) *
+            numpy.fft.rfft(joint.T, size),
+            size,
+        )[:, grid.zero:grid.zero + n_bins].T
+        joint[joint < ROUNDOFF] = 0.0
+
+        # move the solvent universes along by the revenue this month, given
+        # the revenue that arrived before this month
+        marginal = joint.sum(axis=1)
+        weights = numpy.zeros(n_bins)
+        possible = marginal > 0
+        weights[possible] = solvent[possible] / marginal[possible]
+        solvent = numpy.zeros(n_bins)
+        for column in range(grid.n_bins):
+            _shift_add(solvent, weights * joint[:, column], column - grid.zero)
+        return solvent
+
+    def get_outcome_probabilities(self, thresholds):
+        """Calculate the (n_months x len(OUTCOMES)) probability of each
+        outcome in each month, given the (n_months x 4) `thresholds` between
+        outcomes (see `simulation.classify_outcomes`)
+        """
+        outcomes = simulation.classify_outcomes(self.values.T, thresholds)
+        probabilities = simulation.count_outcomes(
+            outcomes, weights=self.probabilities.T,
+        )
+        probabilities[:, -1] += self.bankrupt
+        return probabilities
+
+    def get_quantiles(self, quantiles):
+        """Calculate the (len(quantiles) x n_months) cash at each of the
+        `quantiles` in each month. Universes that ran out of credit are at
+        the bottom of the distribution, with infinitely negative cash.
+        """
+        cdf = self.bankrupt[:, numpy.newaxis] + \
+            numpy.cumsum(self.probabilities, axis=1)
+        n_months, n_bins = cdf.shape
+        cash = numpy.zeros((len(quantiles), n_months))
+        for month in range(n_months):
+            index = numpy.searchsorted(cdf[month], quantiles)
+            cash[:, month] = self.values[month, numpy.minimum(index, n_bins-1)]
+            cash[numpy.less(quantiles, self.bankrupt[month]), month] = \
+                -numpy.inf
+        return cash
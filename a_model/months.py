@@ -0,0 +1,54 @@
+"""Months as integer ordinals. Every date in the reports is the end of a month,
+so rather than doing arithmetic with dates (and approximating a month as 30
+days), dates are converted to the number of months since year 0 and the
+simulations count months with plain integers. Months are only converted back
+to dates for display.
+"""
+
+import datetime
+import calendar
+
+import numpy
+
+# numpy counts datetime64[M] months from January 1970
+NUMPY_EPOCH = 12 * 1970
+
+
+def to_ordinal(date):
+    """Get the month ordinal of `date`"""
+    return 12 * date.year + date.month - 1
+
+
+def to_ordinals(dates):
+    """Get the month ordinals of a sequence or array of `dates` at once"""
+    dates = numpy.asarray(dates)
+    if not numpy.issubdtype(dates.dtype, numpy.datetime64):
+        dates = dates.astype('datetime64[D]')
+    return dates.astype('datetime64[M]').astype(int) + NUMPY_EPOCH
+
+
+def from_ordinal(ordinal):
+    """Get the date at the end of the month `ordinal`"""
+    year, month = divmod(int(ordinal), 12)
+    month += 1
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+
+def from_ordinals(ordinals):
+    """Get the datetime64[D] dates at the end of each of the months in
+    `ordinals` at once
+    """
+    ordinals = numpy.asarray(ordinals, int)
+    first_of_next_month = (ordinals + 1 - NUMPY_EPOCH).astype('datetime64[M]')
+    return first_of_next_month.astype('datetime64[D]') - 1
+
+
+def month_of_year(ordinals):
+    """Get the month of the year (1-12) of each of the months in `ordinals`"""
+    return numpy.asarray(ordinals) % 12 + 1
+
+
+def last_month():
+    """Get the ordinal of last month, which is the last month in the reports
+    """
+    return to_ordinal(datetime.date.today()) - 1
@@ -0,0 +1,42 @@
+import ConfigParser
+
+# all of the [parameters] in config.ini that the model uses
+PARAMETERS = (
+    'tax_rate',
+    'after_tax_salary',
+    'n_months_after_tax_bonus',
+    'fraction_profit_for_dividends',
+    'fixed_monthly_costs',
+    'per_datascoper_costs',
+    'line_of_credit',
+    'n_months_buffer',
+    'billable_hours_per_year',
+)
+
+
+class Parameters(object):
+    """An immutable snapshot of the [parameters] section of config.ini. Every
+    value is parsed into a float once rather than every time it is accessed.
+    Parameters that are missing from config.ini are simply left unset.
+    """
+    __slots__ = PARAMETERS
+
+    def __init__(self, config):
+        for name in PARAMETERS:
+            try:
+                value = config.getfloat('parameters', name)
+            except ConfigParser.NoOptionError:
+                continue
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "parameters are read only. Change the config and recompile it."
+        )
+
+    def __repr__(self):
+        values = ', '.join(
+            '%s=%r' % (name, getattr(self, name))
+            for name in PARAMETERS if hasattr(self, name)
+        )
+        return '<Parameters: %s>' % values
@@ -1,5 +1,7 @@
 import ConfigParser
 
+from .decorators import memoize_derived
+
 
 class Person(object):
     def __init__(self, datascope, name):
@@ -10,14 +12,17 @@ class Person(object):
         return '<Person: %s>' % self.name.title()
 
     @property
+    @memoize_derived
     def is_active(self):
         return self.after_tax_target_salary > 0
 
     @property
+    @memoize_derived
     def is_partner(self):
         return self.ownership > 0
 
     @property
+    @memoize_derived
     def ownership(self):
         try:
             return self.datascope.config.getfloat('ownership', self.name)
@@ -25,6 +30,7 @@ class Person(object):
             return 0.0
 
     @property
+    @memoize_derived
     def after_tax_target_salary(self):
         """This is on a per month basis, but includes biweekly salary as well
         as annual bonus and dividends. If the target take home pay is not
@@ -40,15 +46,18 @@ class Person(object):
             pay = default_pay
         return pay
 
+    @memoize_derived
     def fraction_dividends(self):
         """Fraction of profits that come in the form of a dividend"""
         return self.datascope.fraction_profit_for_dividends * self.ownership
 
+    @memoize_derived
     def fraction_bonus(self):
         """Fraction of profits that come in the form of a bonus"""
         return (1.0-self.datascope.fraction_profit_for_dividends) /\
             self.datascope.n_people
 
+    @memoize_derived
     def net_fraction_of_profits(self):
         """Net fraction of all profits"""
         return self.fraction_dividends() + self.fraction_bonus()
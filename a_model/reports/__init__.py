@@ -1,4 +1,12 @@
-from base import Browser
+from multiprocessing.pool import ThreadPool
+
+# datetime.strptime imports this module the first time it is used, which
+# breaks when that happens in several of the download threads at once
+# http://bugs.python.org/issue7980
+import _strptime
+
+from .. import utils
+from base import QUICKBOOKS_ROOT_URL
 from ar_aging import ARAging
 from balance_sheet import BalanceSheet
 from profit_loss import ProfitLoss
@@ -6,23 +14,139 @@ from unpaid_invoices import UnpaidInvoices
 from revenue_projections import RevenueProjections
 
 
-def cache_quickbooks_locally(username, password):
-    """Download data from various locations"""
+# the reports that are downloaded from quickbooks and the reports that are
+# uploaded to google drive
+QUICKBOOKS_REPORTS = (ARAging, BalanceSheet, ProfitLoss, UnpaidInvoices)
+GDRIVE_REPORTS = (ARAging, BalanceSheet, ProfitLoss)
+
+
+def get_fetcher_classes():
+    """Get the backends to fetch reports with (see `fetchers`) in order of
+    preference. They are only imported when something actually has to be
+    downloaded, and selenium is only needed as a fallback, so it doesn't have
+    to be installed at all.
+    """
+    from .fetchers import HTTPFetcher
+    try:
+        from .browser import Browser
+    except ImportError:
+        return (HTTPFetcher,)
+    return (HTTPFetcher, Browser)
+
+
+def download_from_quickbooks(report_classes, fetcher_class, username,
+                             password, root_url=QUICKBOOKS_ROOT_URL,
+                             n_workers=None):
+    """Download the reports at the same time with `n_workers` threads (one
+    for each report by default). A `shared` fetcher logs in once for all of
+    the reports, and other fetchers log in once for each report. Returns
+    whether each local report changed, or the FetchError for each report
+    that couldn't be fetched.
+    """
+    from .fetchers import FetchError
+
+    def download(report_class, fetcher=None):
+        try:
+            if fetcher is not None:
+                return report_class().download_from_quickbooks(fetcher)
+            with fetcher_class(root_url=root_url) as fetcher:
+                fetcher.login(username, password)
+                return report_class().download_from_quickbooks(fetcher)
+        except FetchError as error:
+            return error
+
+    # the downloads are mostly waiting on quickbooks, so threads are plenty
+    n_workers = n_workers or len(report_classes)
+    pool = ThreadPool(n_workers)
+    try:
+        if not fetcher_class.shared:
+            return pool.map(download, report_classes)
+        try:
+            with fetcher_class(root_url=root_url,
+                               n_connections=n_workers) as fetcher:
+                fetcher.login(username, password)
+                return pool.map(
+                    lambda report_class: download(report_class, fetcher),
+                    report_classes,
+                )
+        except FetchError as error:
+            return [error] * len(report_classes)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def download_with_fallback(report_classes, fetcher_classes, username,
+                           password, root_url=QUICKBOOKS_ROOT_URL,
+                           n_workers=None):
+    """Download each of the reports with the first of the `fetcher_classes`
+    that manages to fetch it (see `download_from_quickbooks`). Returns
+    whether each local report changed, and raises the error of the first
+    report that none of the fetchers could fetch.
+    """
+    from .fetchers import FetchError
+    results = {}
+    remaining = list(report_classes)
+    for fetcher_class in fetcher_classes:
+        if not remaining:
+            break
+        results.update(zip(remaining, download_from_quickbooks(
+            remaining, fetcher_class, username, password, root_url,
+            n_workers,
+        )))
+        remaining = [
+            report_class for report_class in remaining
+            if isinstance(results[report_class], FetchError)
+        ]
+        for report_class in remaining:
+            utils.print_err("couldn't fetch %s with %s: %s" % (
+                report_class.report_name, fetcher_class.__name__,
+                results[report_class],
+            ))
+    if remaining:
+        raise results[remaining[0]]
+    return [results[report_class] for report_class in report_classes]
+
 
-    # these things all come from quickbooks and require selenium
-    with Browser() as browser:
-        browser.login_quickbooks(username, password)
-        ARAging().download_from_quickbooks(browser)
-        BalanceSheet().download_from_quickbooks(browser)
-        ProfitLoss().download_from_quickbooks(browser)
-        UnpaidInvoices().download_from_quickbooks(browser)
+def cache_quickbooks_locally(username, password, n_workers=None,
+                             root_url=QUICKBOOKS_ROOT_URL,
+                             fetcher_classes=None):
+    """Download data from various locations. Each quickbooks report is
+    downloaded with the first of the `fetcher_classes` (see
+    `get_fetcher_classes`) that manages to fetch it. `root_url` can point
+    the downloads somewhere other than quickbooks, like a local server with
+    reports for testing. Returns the classes of the reports that changed.
+    """
+    if fetcher_classes is None:
+        fetcher_classes = get_fetcher_classes()
+    changed = download_with_fallback(
+        QUICKBOOKS_REPORTS, fetcher_classes, username, password, root_url,
+        n_workers,
+    )
+    changed_reports = [
+        report_class
+        for report_class, report_changed in zip(QUICKBOOKS_REPORTS, changed)
+        if report_changed
+    ]
 
     # this is manually entered in a google spreadsheet
-    RevenueProjections().download_from_gdrive()
+    if RevenueProjections().download_from_gdrive():
+        changed_reports.append(RevenueProjections)
+    return changed_reports
 
 
-def sync_local_cache_with_gdrive():
-    """We only need to upload these reports to Google Drive"""
-    ARAging().upload_to_gdrive()
-    BalanceSheet().upload_to_gdrive()
-    ProfitLoss().upload_to_gdrive()
+def sync_local_cache_with_gdrive(report_classes=GDRIVE_REPORTS,
+                                 google_workbook=None, full=False):
+    """We only need to upload these reports to Google Drive, and only when
+    they changed. The reports all share one `google_workbook`, which is
+    authorized and opened once (see `gsheets.open_workbook`) by default.
+    """
+    from .gsheets import open_workbook
+    report_classes = [
+        report_class for report_class in GDRIVE_REPORTS
+        if report_class in report_classes
+    ]
+    if report_classes and google_workbook is None:
+        google_workbook = open_workbook()
+    for report_class in report_classes:
+        report_class().upload_to_gdrive(google_workbook, full)
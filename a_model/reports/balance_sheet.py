@@ -1,15 +1,28 @@
-import openpyxl
-
 from .base import Report
+from .formulas import FormulaResolver, parse_coordinate
+
+# the lines of the balance sheet with the totals of each type of account
+CASH_IN_BANK = 'Total Bank Accounts'
+ACCOUNTS_RECEIVABLE = 'Total Accounts Receivable'
+CREDIT_CARDS = 'Total Credit Cards'
 
 
 class BalanceSheet(Report):
     report_name = 'balance_sheet.xlsx'
     gsheet_tab_name = 'Balance Sheet'
+    incremental = True
 
     def __init__(self, *args, **kwargs):
         super(BalanceSheet, self).__init__(*args, **kwargs)
-        self._historical_cash_in_bank = None
+        self._dates = None
+        self._lines = None
+        self._resolver = None
+
+    def forget_records(self):
+        super(BalanceSheet, self).forget_records()
+        self._dates = None
+        self._lines = None
+        self._resolver = None
 
     def get_qbo_query_params(self):
         return (
@@ -20,47 +33,55 @@ class BalanceSheet(Report):
         ) + self.get_date_customized_params()
 
     def get_current_cash_in_bank(self):
-        historical_cash_in_bank = self.get_historical_cash_in_bank()
-        return historical_cash_in_bank[-1][1]
+        return float(self.get_historical_cash_in_bank().amounts[-1])
 
     def get_historical_cash_in_bank(self):
-        if self._historical_cash_in_bank is not None:
-            return self._historical_cash_in_bank
-        self._historical_cash_in_bank = []
-        worksheet = self.open_worksheet()
+        return self.get_records()
 
-        # get the dates
-        dates = []
-        max_col = openpyxl.cell.get_column_letter(
-            worksheet.get_highest_column()
-        )
-        for cell in self.iter_cells_in_row(5, 'B', max_col):
-            dates.append(self.get_date_from_cell(cell))
+    def get_historical_accounts_receivable(self):
+        return self.get_historical_line(ACCOUNTS_RECEIVABLE)
 
-        # get the values
-        for row in worksheet.iter_rows():
-            account = row[0].value
-            if account and account.strip() == 'Total Bank Accounts':
-                for date, cell in zip(dates, row[1:]):
-                    self._historical_cash_in_bank.append((
-                        date,
-                        self._get_cash_in_bank(cell)
-                    ))
-        return self._historical_cash_in_bank
+    def get_historical_credit_cards(self):
+        return self.get_historical_line(CREDIT_CARDS)
 
-    def _get_cash_in_bank(self, cell):
-        """
-        `Total Bank Accounts` cell is actually a sum of all individual bank
-        account amounts. Need to do sum by hand.
+    def parse_records(self):
+        return [
+            (date, amount, CASH_IN_BANK)
+            for date, amount in self.get_historical_line(CASH_IN_BANK)
+        ]
+
+    def get_historical_line(self, account):
+        """Get the (date, amount) at the end of every month for the line of
+        the balance sheet labeled `account`. Totals are formulas that add up
+        other cells, which are resolved by hand.
         """
+        if self._resolver is None:
+            self._read_lines()
+        if account not in self._lines:
+            raise ValueError(
+                "There is no '%s' line in the balance sheet" % account
+            )
+        row = self._lines[account]
+        min_col = parse_coordinate('B1')[1]
+        amounts = self._resolver.resolve_row(
+            row, min_col, min_col + len(self._dates) - 1,
+        )
+        return zip(self._dates, amounts)
+
+    def _read_lines(self):
+        import openpyxl
+        worksheet = self.open_worksheet(read_only=self.streaming)
+
+        # get the dates
+        self._dates = []
+        max_col = openpyxl.cell.get_column_letter(worksheet.max_column)
+        for cell in self.iter_cells_in_row(5, 'B', max_col):
+            self._dates.append(self.get_date_from_cell(cell))
 
-        formula = cell.value
-        formula = formula.replace('(', '').replace(')', '')
-        cash_in_bank = 0.0
-        for cell in formula.strip('=').split('+'):
-            try:
-                amount = float(self.worksheet[cell].value.strip('='))
-            except:
-                amount = 0.0
-            cash_in_bank += amount
-        return cash_in_bank
+        # read all of the values at once and find the row of each line
+        self._resolver = FormulaResolver.from_worksheet(worksheet)
+        self.close_worksheet()
+        self._lines = {}
+        for (row, column), value in self._resolver.values.iteritems():
+            if column == 1 and isinstance(value, basestring):
+                self._lines.setdefault(value.strip(), row)
@@ -1,84 +1,46 @@
-# NOTE: The quickbooks API is intended for webapps, not for people to download
-# their own data. A simple downloading scheme with requests didn't work because
-# of some janky ass javascript and iframe bullshit that quickbooks online has.
-# Selenium was the best choice.
 import os
 import datetime
-import glob
-import time
-import itertools
-import json
-import math
-import re
-
-import openpyxl
-from selenium import webdriver
-import gspread
-from oauth2client.client import SignedJwtAssertionCredentials
+import hashlib
+import zipfile
+import filecmp
+import shutil
+
+import numpy
 
 from .. import utils
+from .. import cache
+from .. import months
+from ..decorators import source_version
+from .records import Records
 
 QUICKBOOKS_ROOT_URL = 'http://qbo.intuit.com'
-EXCEL_MIMETYPES = (
-    'application/vnd.ms-excel',
-    'application/msexcel',
-    'application/x-msexcel',
-    'application/x-ms-excel',
-    'application/x-excel',
-    'application/x-dos_ms_excel',
-    'application/xls',
-    'application/x-xls',
-    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-)
-
-
-class Browser(webdriver.Firefox):
-    """
-    This class is a context manager to be sure to close the browser when we're
-    all done.
-    """
-    def __init__(self, *args, **kwargs):
-
-        # create a firefox profile to automatically download files (like excel
-        # files) without having to approve of the download
-        # http://bit.ly/1WeZziv
-        profile = webdriver.FirefoxProfile()
-        profile.set_preference("browser.download.folderList", 2)
-        profile.set_preference(
-            "browser.download.manager.showWhenStarting",
-            False,
-        )
-        profile.set_preference("browser.download.dir", utils.DATA_ROOT)
-        profile.set_preference(
-            "browser.helperApps.neverAsk.saveToDisk",
-            ','.join(EXCEL_MIMETYPES)
-        )
-
-        # instantiate a firefox instance and implicitly wait for find_element_*
-        # methods for 10 seconds in case content does not immediately appear
-        kwargs.update({'firefox_profile': profile})
-        super(Browser, self).__init__(*args, **kwargs)
-        self.implicitly_wait(30)
 
-    # __enter__ and __exit__ make it a context manager
-    # https://code.google.com/p/selenium/issues/detail?id=3228
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+# the code that parses reports into records: this package (the parsers, the
+# formula engine and `Records`) and the month ordinals that records use
+PARSER_SOURCES = (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.abspath(months.__file__),
+)
 
-    def login_quickbooks(self, username, password):
-        self.get(QUICKBOOKS_ROOT_URL)
-        self.find_element_by_name("login").send_keys(username)
-        self.find_element_by_name("password").send_keys(password)
-        self.find_element_by_id("LoginButton").click()
+# the number of months that are stored locally that are downloaded again by
+# incremental syncs, since the books for the last few months may still change
+REVISED_MONTHS = 3
 
 
 class Report(object):
     report_name = None
     gsheet_tab_name = None
 
+    # whether to stream the rows of the worksheet when parsing records (see
+    # `open_worksheet`)
+    streaming = True
+
+    # whether syncs only download the most recent months of the report and
+    # merge them into the local history (see `store_download`), and whether
+    # the last column of the report is the total of each line
+    incremental = False
+    has_total_column = False
+
     # parameters for quickbooks url
     # url for quickbooks QUICKBOOKS_ROOT_URL
     start_date = datetime.date(2014, 1, 1)
@@ -88,6 +50,8 @@ class Report(object):
         self.filename = os.path.join(
             utils.DATA_ROOT, self.report_name
         )
+        self.worksheet = None
+        self._records = None
 
     def get_date_customized_params(self):
         return (
@@ -103,92 +67,208 @@ class Report(object):
     @property
     def url(self):
         """convenience function for creating report urls"""
-        report_url = QUICKBOOKS_ROOT_URL + '/app/report'
+        return self.get_url()
+
+    def get_url(self, root_url=QUICKBOOKS_ROOT_URL):
+        report_url = root_url + '/app/report'
         return report_url + '?' + utils.urlencode(self.get_qbo_query_params())
 
-    def download_from_quickbooks(self, browser):
-        # remove all of the old report*.xlsx crappy filenames that quickbooks
-        # creates by default
-        report_regex = os.path.join(utils.DATA_ROOT, 'report*.xlsx')
-        for filename in glob.glob(report_regex):
-            os.remove(filename)
-
-        # go to the P&L page and download the report locally
-        browser.get(self.url)
-        iframe = browser.find_element_by_tag_name('iframe')
-        browser.switch_to_frame(iframe)
-        iframe2 = browser.find_element_by_tag_name('iframe')
-        browser.switch_to_frame(iframe2)
-        browser.find_element_by_css_selector('option[value=xlsx]').click()
-        browser.switch_to_default_content()
-
-        # check to see if the file has been downloaded
-        while not glob.glob(report_regex):
-            time.sleep(1)
-        qbo_filename = glob.glob(report_regex)[0]
-        os.rename(qbo_filename, self.filename)
+    def download_from_quickbooks(self, fetcher):
+        """Download the report with a `fetcher` that is logged in to
+        quickbooks (see `fetchers`) and return whether the local report
+        changed (see `store_download`)
+        """
+        self.start_date = self.get_sync_start_date()
+        return self.store_download(fetcher.fetch(self))
 
-    def open_google_workbook(self):
-        """Convenience method for opening up the google workbook"""
-
-        # read json from file
-        gdrive_credentials = os.path.join(utils.DROPBOX_ROOT, 'gdrive.json')
-        with open(gdrive_credentials) as stream:
-            key = json.load(stream)
-
-        # authorize with credentials
-        credentials = SignedJwtAssertionCredentials(
-            key['client_email'],
-            key['private_key'],
-            ['https://spreadsheets.google.com/feeds'],
+    @property
+    def download_filename(self):
+        """The last report that was downloaded. This is the local report
+        itself unless the report is `incremental`.
+        """
+        if not self.incremental:
+            return self.filename
+        return os.path.join(utils.DATA_ROOT, 'downloads', self.report_name)
+
+    def get_sync_start_date(self):
+        """Get the first day of the months to download. Incremental reports
+        only need the months after the ones that are stored locally and the
+        last `REVISED_MONTHS` months that are stored locally.
+        """
+        start_date = type(self).start_date
+        if not self.incremental or not os.path.exists(self.filename):
+            return start_date
+        stored_months = self.get_records().months
+        if not len(stored_months):
+            return start_date
+        month = max(
+            stored_months.max() - REVISED_MONTHS + 1,
+            months.to_ordinal(start_date),
         )
-        gdrive = gspread.authorize(credentials)
+        return months.from_ordinal(month).replace(day=1)
+
+    def store_download(self, downloaded_filename):
+        """Store the report in `downloaded_filename` and return whether the
+        local report changed. A download that is byte-identical to the last
+        one is thrown away without touching anything. Downloads of the most
+        recent months of `incremental` reports are merged into the local
+        report (see `history`).
+        """
+        if os.path.exists(self.filename) and \
+                os.path.exists(self.download_filename) and \
+                filecmp.cmp(downloaded_filename, self.download_filename,
+                            shallow=False):
+            os.remove(downloaded_filename)
+            return False
+
+        # the download directory is on the same filesystem, so the reports
+        # are replaced all at once
+        if not self.incremental:
+            os.rename(downloaded_filename, self.filename)
+        elif os.path.exists(self.filename):
+            from .history import MonthlyWorksheet
+            history = MonthlyWorksheet.read(
+                self, self.filename, self.has_total_column,
+            ).merge(MonthlyWorksheet.read(
+                self, downloaded_filename, self.has_total_column,
+            ))
+            cache.atomic_write(
+                self.filename,
+                lambda stream: history.save(stream, self.has_total_column),
+            )
+        else:
+            shutil.copyfile(downloaded_filename, self.filename)
 
-        # open spreadsheet and read all content as a list of lists
-        return gdrive.open_by_url(key['url'])
+        # incremental reports keep the download to compare the next one to
+        if self.incremental:
+            cache.makedirs(os.path.dirname(self.download_filename))
+            os.rename(downloaded_filename, self.download_filename)
+        self.forget_records()
+        return True
 
-    def open_google_worksheet(self):
-        google_workbook = self.open_google_workbook()
-        return google_workbook.worksheet(self.gsheet_tab_name)
+    def open_google_workbook(self):
+        """Convenience method for opening up the google workbook (see
+        `gsheets.open_workbook`)
+        """
+        from .gsheets import open_workbook
+        return open_workbook()
+
+    def open_google_worksheet(self, google_workbook=None):
+        from .gsheets import with_retries
+        if google_workbook is None:
+            google_workbook = self.open_google_workbook()
+        return with_retries(google_workbook.worksheet, self.gsheet_tab_name)
 
     def download_from_gdrive(self):
+        """Download the report from google drive and return whether the local
+        report changed (see `store_download`)
+        """
         google_worksheet = self.open_google_worksheet()
         response = google_worksheet.export('xlsx')
-        with open(self.filename, 'w') as output:
+        downloaded_filename = self.filename + cache.TEMPORARY_EXTENSION
+        with open(downloaded_filename, 'w') as output:
             output.write(response.read())
         print self.filename
+        return self.store_download(downloaded_filename)
+
+    def upload_to_gdrive(self, google_workbook=None, full=False):
+        """Upload the cells of the local report that differ from its google
+        worksheet, or every cell if `full` (see `gsheets`). Several reports
+        can share the same `google_workbook` so that it is only opened once.
+        """
+        from .gsheets import read_local_cells, sync_worksheet
+        google_worksheet = self.open_google_worksheet(google_workbook)
+        local_cells = read_local_cells(self.open_worksheet())
+        self.close_worksheet()
+        n_cells = sync_worksheet(google_worksheet, local_cells, full)
+        print "%s: uploaded %d cells" % (self.gsheet_tab_name, n_cells)
+
+    def open_worksheet(self, read_only=False):
+        """Open the worksheet in the xlsx file. In `read_only` mode, rows are
+        streamed from the file one at a time as cells are iterated over (see
+        `iter_cells_in_range`) instead of loading the whole workbook and its
+        styles into memory, so memory use does not grow with the size of the
+        report. Looking up individual cells is slow in this mode.
+        """
+        # openpyxl is imported here rather than at the top of the module so
+        # that the reports can be loaded from their snapshots without it
+        import openpyxl
 
-    def upload_to_gdrive(self):
-        # parse the resulting data from xlsx and upload it to a google
-        # spreadsheet
-        excel_worksheet = self.open_worksheet()
-        pl_dimension = excel_worksheet.calculate_dimension()
-        excel_row_list = excel_worksheet.range(pl_dimension)
-        excel_cell_list = itertools.chain(*excel_row_list)
-
-        # clear the google doc contents
-        google_worksheet = self.open_google_worksheet()
-        print google_worksheet.row_count, google_worksheet.col_count
-        not_empty_cells = google_worksheet.findall(re.compile(r'[a-zA-Z0-9]+'))
-        for cell in not_empty_cells:
-            cell.value = ''
-        google_worksheet.update_cells(not_empty_cells)
-
-        # upload the contents
-        google_cell_list = google_worksheet.range(pl_dimension)
-        for google_cell, excel_cell in zip(google_cell_list, excel_cell_list):
-            if excel_cell.value is None:
-                google_cell.value = ''
-            else:
-                google_cell.value = excel_cell.value
-        google_worksheet.update_cells(google_cell_list)
-
-    def open_worksheet(self):
         # all of the quickbooks reports only have one active sheet
-        workbook = openpyxl.load_workbook(self.filename)
+        self.close_worksheet()
+        workbook = openpyxl.load_workbook(self.filename, read_only=read_only)
         self.worksheet = workbook.active
         return self.worksheet
 
+    def close_worksheet(self):
+        """Release the workbook once everything has been parsed out of it"""
+        if self.worksheet is None:
+            return
+        archive = getattr(self.worksheet.parent, '_archive', None)
+        if archive is not None:
+            archive.close()
+        self.worksheet = None
+
+    def parse_records(self):
+        """Parse the list of (date, amount, source) records out of the
+        worksheet, where the source is the client or invoice that each amount
+        belongs to
+        """
+        raise NotImplementedError
+
+    def validate_records(self, records):
+        """Check the `records` once, when they are loaded, rather than every
+        time they are used
+        """
+        if not numpy.isfinite(records.amounts).all():
+            raise ValueError(
+                "Double check %s. There is an amount that is not a number" %
+                self.report_name
+            )
+
+    @property
+    def snapshot_filename(self):
+        """The snapshot of the records (see `Records`) is keyed by the contents
+        of the xlsx file and all of the code that parses it (see
+        `PARSER_SOURCES`)
+        """
+        m = hashlib.sha1(utils.file_fingerprint(self.filename))
+        m.update(source_version(*PARSER_SOURCES))
+        name = os.path.splitext(self.report_name)[0]
+        return os.path.join(
+            utils.DATA_ROOT, 'snapshots', name + '-' + m.hexdigest() + '.npz',
+        )
+
+    def get_records(self):
+        """Get the `Records` in this report. The xlsx file is only parsed if
+        there is no snapshot of its current contents yet.
+        """
+        if self._records is not None:
+            return self._records
+        snapshot_filename = self.snapshot_filename
+        try:
+            records = Records.load(snapshot_filename)
+        except (IOError, ValueError, KeyError, zipfile.BadZipfile):
+            records = Records.from_tuples(self.parse_records())
+            self.close_worksheet()
+            cache.makedirs(os.path.dirname(snapshot_filename))
+            cache.atomic_write(snapshot_filename, records.save)
+        self.validate_records(records)
+        self._records = records
+        return self._records
+
+    def forget_records(self):
+        """Forget the records of the report once it changes"""
+        self._records = None
+
+    def get_payments(self):
+        """Get the number of months from now and the amount of every record
+        as a pair of arrays
+        """
+        records = self.get_records()
+        now = months.to_ordinal(self.get_now())
+        return records.months.astype(int) - now, records.amounts
+
     def _row_cell_range(self, row, min_col, max_col):
         return '%(min_col)s%(row)d:%(max_col)s%(row)d' % locals()
 
@@ -209,34 +289,32 @@ class Report(object):
         return self.iter_cells_in_range(cell_range)
 
     def get_date_from_cell(self, date_cell):
-        if isinstance(date_cell.value, datetime.datetime):
-            date = date_cell.value
+        return self.get_date_from_value(date_cell.value)
+
+    def get_date_from_value(self, value):
+        if isinstance(value, datetime.datetime):
+            date = value
         else:
             try:
-                date = datetime.datetime.strptime(date_cell.value, '%b %Y')
+                date = datetime.datetime.strptime(value, '%b %Y')
             except ValueError:
-                date = utils.qbo_date(date_cell.value)
+                date = utils.qbo_date(value)
         return utils.end_of_month(date)
 
     def get_now(self):
         return utils.end_of_last_month()
 
     def get_months_from_now(self, date):
-        now = self.get_now()
-        delta = date - now
-        return int(math.floor(delta.days / 30.))
+        return months.to_ordinal(date) - months.to_ordinal(self.get_now())
 
     def get_date_in_n_months(self, n_months):
-        t = self.get_now()
-        for month in range(n_months):
-            t += datetime.timedelta(days=1)
-            t = utils.end_of_month(t)
-        return t
+        now = months.to_ordinal(self.get_now())
+        return months.from_ordinal(now + n_months)
 
     def get_float_from_cell(self, float_cell):
         if float_cell.value is None:
             return 0.0
-        elif isinstance(float_cell.value, (float, int)):
+        elif isinstance(float_cell.value, (float, int, long)):
             return float(float_cell.value)
         else:
             return float(float_cell.value.strip('='))
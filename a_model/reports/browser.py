@@ -0,0 +1,88 @@
+# NOTE: The quickbooks API is intended for webapps, not for people to download
+# their own data. A simple downloading scheme with requests didn't work because
+# of some janky ass javascript and iframe bullshit that quickbooks online has.
+# Selenium was the best choice.
+from selenium import webdriver
+
+from .base import QUICKBOOKS_ROOT_URL
+from .fetchers import Fetcher
+from .downloads import DownloadWatcher
+
+EXCEL_MIMETYPES = (
+    'application/vnd.ms-excel',
+    'application/msexcel',
+    'application/x-msexcel',
+    'application/x-ms-excel',
+    'application/x-excel',
+    'application/x-dos_ms_excel',
+    'application/xls',
+    'application/x-xls',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+)
+
+
+class Browser(webdriver.Firefox, Fetcher):
+    """
+    Fetch reports with firefox. Like every `Fetcher`, this class is a context
+    manager to be sure to quit the browser when we're all done.
+    """
+    def __init__(self, root_url=QUICKBOOKS_ROOT_URL, download_dir=None,
+                 *args, **kwargs):
+        Fetcher.__init__(self, root_url, download_dir)
+
+        # create a firefox profile to automatically download files (like excel
+        # files) without having to approve of the download
+        # http://bit.ly/1WeZziv
+        profile = webdriver.FirefoxProfile()
+        profile.set_preference("browser.download.folderList", 2)
+        profile.set_preference(
+            "browser.download.manager.showWhenStarting",
+            False,
+        )
+        profile.set_preference("browser.download.dir", self.download_dir)
+        profile.set_preference(
+            "browser.helperApps.neverAsk.saveToDisk",
+            ','.join(EXCEL_MIMETYPES)
+        )
+
+        # instantiate a firefox instance and implicitly wait for find_element_*
+        # methods for 10 seconds in case content does not immediately appear
+        kwargs.update({'firefox_profile': profile})
+        super(Browser, self).__init__(*args, **kwargs)
+        self.implicitly_wait(30)
+
+    # __enter__ and __exit__ make it a context manager
+    # https://code.google.com/p/selenium/issues/detail?id=3228
+    # newer versions of selenium make webdrivers context managers of their
+    # own, which would come before `Fetcher` and leave the download directory
+    # behind, so these are spelled out here
+    def __enter__(self):
+        return Fetcher.__enter__(self)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Fetcher.__exit__(self, exc_type, exc_val, exc_tb)
+
+    def login_quickbooks(self, username, password):
+        self.get(self.root_url)
+        self.find_element_by_name("login").send_keys(username)
+        self.find_element_by_name("password").send_keys(password)
+        self.find_element_by_id("LoginButton").click()
+
+    def login(self, username, password):
+        self.login_quickbooks(username, password)
+
+    def fetch(self, report):
+        """The download directory of the browser is its own, so whatever xlsx
+        file shows up in there is the report
+        """
+        with DownloadWatcher(self.download_dir) as watcher:
+
+            # go to the report page and download the report locally
+            self.get(report.get_url(self.root_url))
+            iframe = self.find_element_by_tag_name('iframe')
+            self.switch_to_frame(iframe)
+            iframe2 = self.find_element_by_tag_name('iframe')
+            self.switch_to_frame(iframe2)
+            self.find_element_by_css_selector('option[value=xlsx]').click()
+            self.switch_to_default_content()
+            return watcher.wait()
@@ -0,0 +1,90 @@
+"""Wait for reports to finish downloading. Rather than polling the download
+directory, a watchdog observer waits for the filesystem events of the
+download, which are either a new file or a partial download that is renamed
+when it is done.
+"""
+
+import os
+import glob
+import zipfile
+import threading
+
+from watchdog.observers import Observer
+from watchdog.events import PatternMatchingEventHandler
+
+from .fetchers import FetchError
+
+# how long to wait for a report to download, in seconds
+DOWNLOAD_TIMEOUT = 5 * 60
+
+# extension of the partial downloads that firefox renames once it is done
+PARTIAL_EXTENSION = '.part'
+
+
+class DownloadTimeout(FetchError):
+    pass
+
+
+def is_complete(filename):
+    """Whether `filename` is a complete xlsx file. An xlsx file is a zip file
+    and the directory of a zip file is at the very end, so a download that is
+    still in progress is never a valid zip file.
+    """
+    if os.path.exists(filename + PARTIAL_EXTENSION):
+        return False
+    return zipfile.is_zipfile(filename)
+
+
+class DownloadHandler(PatternMatchingEventHandler):
+
+    def __init__(self, patterns):
+        super(DownloadHandler, self).__init__(
+            patterns=patterns, ignore_directories=True,
+        )
+        self.finished = threading.Event()
+        self.filename = None
+
+    def check(self, filename):
+        if not self.finished.is_set() and is_complete(filename):
+            self.filename = filename
+            self.finished.set()
+
+    def on_any_event(self, event):
+        self.check(getattr(event, 'dest_path', event.src_path))
+
+
+class DownloadWatcher(object):
+    """This class is a context manager that watches `directory` for a file
+    matching one of `patterns` to finish downloading (see `wait`)
+    """
+
+    def __init__(self, directory, patterns=('*.xlsx',)):
+        self.directory = directory
+        self.patterns = list(patterns)
+        self.handler = DownloadHandler(self.patterns)
+        self.observer = None
+
+    def __enter__(self):
+        self.observer = Observer()
+        self.observer.schedule(self.handler, self.directory)
+        self.observer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.observer.stop()
+        self.observer.join()
+
+    def wait(self, timeout=DOWNLOAD_TIMEOUT):
+        """Wait for the download to finish and return its filename"""
+
+        # the download may have finished before the first event was handled
+        for pattern in self.patterns:
+            for filename in glob.glob(os.path.join(self.directory, pattern)):
+                self.handler.check(filename)
+        if not self.handler.finished.wait(timeout):
+            raise DownloadTimeout(
+                "nothing matching %s was downloaded to %s in %d seconds" % (
+                    ', '.join(self.patterns), self.directory, timeout,
+                )
+            )
+        return self.handler.filename
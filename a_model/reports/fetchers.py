@@ -0,0 +1,153 @@
+"""Backends that fetch reports from quickbooks. Every backend is a `Fetcher`,
+which logs in and then fetches reports into a download directory of its own.
+The `HTTPFetcher` only needs plain HTTP requests, which is much faster and
+lighter than driving a browser. The selenium `Browser` (see `browser`) works
+wherever quickbooks insists on a real browser, so it is the fallback for any
+report that the `HTTPFetcher` can't fetch.
+"""
+
+import os
+import shutil
+import zipfile
+import tempfile
+import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from .. import utils
+from .. import cache
+from .base import QUICKBOOKS_ROOT_URL
+
+
+class FetchError(Exception):
+    pass
+
+
+def find_login_form(html):
+    """Find the form with a password field in `html`, if there is one"""
+    soup = BeautifulSoup(html, 'html.parser')
+    password = soup.find('input', attrs={'name': 'password'})
+    if password is None:
+        return None
+    return password.find_parent('form')
+
+
+class Fetcher(object):
+    """This class is a context manager to be sure to clean up after fetching
+    reports. Every fetcher downloads reports into a `download_dir` of its own
+    (a new temporary directory by default), so that several fetchers can
+    download reports at the same time without mixing up their files.
+    """
+
+    # whether a single fetcher can fetch every report from several threads at
+    # once, or every report needs a fetcher of its own
+    shared = False
+
+    def __init__(self, root_url=QUICKBOOKS_ROOT_URL, download_dir=None):
+        self.root_url = root_url
+        self.download_dir = download_dir
+        self._temporary_download_dir = self.download_dir is None
+        if self._temporary_download_dir:
+            downloads_root = os.path.join(utils.DATA_ROOT, 'downloads')
+            cache.makedirs(downloads_root)
+            self.download_dir = tempfile.mkdtemp(dir=downloads_root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.quit()
+        if self._temporary_download_dir:
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+
+    def quit(self):
+        pass
+
+    def login(self, username, password):
+        raise NotImplementedError
+
+    def fetch(self, report):
+        """Fetch the xlsx file of `report` into the download directory and
+        return its filename
+        """
+        raise NotImplementedError
+
+
+class HTTPFetcher(Fetcher):
+    """Fetch reports with plain HTTP requests in a single session that logs in
+    once and is shared by all of the threads that fetch reports. The session
+    keeps a pool of `n_connections` connections open and every export is
+    streamed to the download directory as it arrives.
+    """
+    shared = True
+
+    # the query parameters that export a report as an xlsx file
+    export_params = (('format', 'xlsx'),)
+    chunk_size = 64 * 1024
+
+    def __init__(self, root_url=QUICKBOOKS_ROOT_URL, download_dir=None,
+                 n_connections=10, timeout=60):
+        super(HTTPFetcher, self).__init__(root_url, download_dir)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=n_connections,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def quit(self):
+        self.session.close()
+
+    def request(self, method, url, **kwargs):
+        try:
+            response = self.session.request(
+                method, url, timeout=self.timeout, **kwargs
+            )
+            response.raise_for_status()
+        except requests.RequestException as error:
+            raise FetchError("couldn't %s %s: %s" % (method, url, error))
+        return response
+
+    def login(self, username, password):
+        """Fill out and submit the login form like a browser would"""
+        response = self.request('GET', self.root_url)
+        form = find_login_form(response.text)
+        if form is None:
+            raise FetchError("there is no login form at %s" % self.root_url)
+        fields = dict(
+            (field['name'], field.get('value', ''))
+            for field in form.find_all('input') if field.get('name')
+        )
+        fields.update({'login': username, 'password': password})
+        url = urlparse.urljoin(response.url, form.get('action') or '')
+        method = (form.get('method') or 'post').upper()
+        if method == 'GET':
+            response = self.request(method, url, params=fields)
+        else:
+            response = self.request(method, url, data=fields)
+        if find_login_form(response.text) is not None:
+            raise FetchError("quickbooks did not accept the login")
+
+    def fetch(self, report):
+        url = report.get_url(self.root_url)
+        url += '&' + utils.urlencode(self.export_params)
+        response = self.request('GET', url, stream=True)
+        filename = os.path.join(self.download_dir, report.report_name)
+
+        def write(stream):
+            for chunk in response.iter_content(self.chunk_size):
+                stream.write(chunk)
+        try:
+            cache.atomic_write(filename, write)
+        except requests.RequestException as error:
+            raise FetchError("couldn't download %s: %s" % (url, error))
+        finally:
+            response.close()
+
+        # a session that is no longer logged in gets a web page instead
+        if not zipfile.is_zipfile(filename):
+            os.remove(filename)
+            raise FetchError("%s is not an xlsx file" % url)
+        return filename
@@ -0,0 +1,237 @@
+"""Resolve the formulas in QuickBooks exports. Amounts in the exported xlsx
+files are formulas like `=1234.56` and the totals and subtotals are formulas
+that refer to other cells, like `=(B7)+(B8)` or `=SUM(B7:B9)`, which openpyxl
+does not evaluate. Each distinct formula is parsed once and every cell is
+evaluated at most once, no matter how many totals refer to it.
+"""
+
+import re
+
+TOKEN_REGEX = re.compile(r'''
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|
+        (?P<cell>\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)(?!\w|\()|
+        (?P<function>[A-Za-z_][A-Za-z_0-9.]*)\s*\(|
+        (?P<operator>[-+*/(),])
+    )
+''', re.VERBOSE)
+CELL_REGEX = re.compile(r'\$?([A-Za-z]{1,3})\$?(\d+)')
+
+# the SUBTOTAL function numbers that add things up (109 ignores hidden rows,
+# which doesn't matter here)
+SUBTOTAL_SUMS = (9, 109)
+
+
+class FormulaError(ValueError):
+    pass
+
+
+def parse_coordinate(coordinate):
+    """Convert a cell `coordinate` like 'B7' into a (row, column) tuple"""
+    match = CELL_REGEX.match(coordinate)
+    letters, row = match.groups()
+    column = 0
+    for letter in letters.upper():
+        column = 26 * column + ord(letter) - ord('A') + 1
+    return int(row), column
+
+
+def tokenize(formula):
+    tokens = []
+    position = 0
+    formula = formula.rstrip()
+    while position < len(formula):
+        match = TOKEN_REGEX.match(formula, position)
+        if match is None:
+            raise FormulaError(
+                "can't parse '%s' at '%s'" % (formula, formula[position:])
+            )
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class Parser(object):
+    """Recursive descent parser for the arithmetic in QuickBooks formulas.
+    Formulas are parsed into nested tuples:
+
+        ('number', value)
+        ('cells', ((row, column), ...))
+        ('negative', node)
+        ('+' | '-' | '*' | '/', left, right)
+        ('sum', (node, ...))
+    """
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.tokens = tokenize(formula)
+        self.position = 0
+
+    def parse(self):
+        node = self.parse_expression()
+        if self.position != len(self.tokens):
+            self.error()
+        return node
+
+    def error(self):
+        raise FormulaError("can't parse '%s'" % self.formula)
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def pop(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, value):
+        if self.pop() != ('operator', value):
+            self.error()
+
+    def parse_expression(self):
+        node = self.parse_term()
+        while self.peek() in (('operator', '+'), ('operator', '-')):
+            operator = self.pop()[1]
+            node = (operator, node, self.parse_term())
+        return node
+
+    def parse_term(self):
+        node = self.parse_factor()
+        while self.peek() in (('operator', '*'), ('operator', '/')):
+            operator = self.pop()[1]
+            node = (operator, node, self.parse_factor())
+        return node
+
+    def parse_factor(self):
+        kind, value = self.pop()
+        if (kind, value) == ('operator', '-'):
+            return ('negative', self.parse_factor())
+        elif (kind, value) == ('operator', '+'):
+            return self.parse_factor()
+        elif (kind, value) == ('operator', '('):
+            node = self.parse_expression()
+            self.expect(')')
+            return node
+        elif kind == 'number':
+            return ('number', float(value))
+        elif kind == 'cell':
+            return ('cells', self.parse_cells(value))
+        elif kind == 'function':
+            return self.parse_function(value.upper())
+        self.error()
+
+    def parse_cells(self, cell_range):
+        """Expand a cell or a range of cells into (row, column) tuples"""
+        first, _, last = cell_range.partition(':')
+        min_row, min_col = parse_coordinate(first)
+        max_row, max_col = parse_coordinate(last or first)
+        return tuple(
+            (row, column)
+            for row in range(min(min_row, max_row), max(min_row, max_row) + 1)
+            for column in range(min(min_col, max_col), max(min_col, max_col)+1)
+        )
+
+    def parse_function(self, name):
+        arguments = []
+        if self.peek() != ('operator', ')'):
+            arguments.append(self.parse_expression())
+            while self.peek() == ('operator', ','):
+                self.pop()
+                arguments.append(self.parse_expression())
+        self.expect(')')
+        if name == 'SUM':
+            return ('sum', tuple(arguments))
+        elif name == 'SUBTOTAL' and arguments and \
+                arguments[0][0] == 'number' and \
+                int(arguments[0][1]) in SUBTOTAL_SUMS:
+            return ('sum', tuple(arguments[1:]))
+        raise FormulaError(
+            "'%s' in '%s' is not supported" % (name, self.formula)
+        )
+
+
+class FormulaResolver(object):
+    """Evaluate the cells of a worksheet. `values` maps the (row, column) of
+    every non-empty cell to its raw value from openpyxl.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self._parsed = {}
+        self._resolved = {}
+        self._resolving = set()
+
+    @classmethod
+    def from_worksheet(cls, worksheet):
+        """Read the values of all of the cells in a (possibly read-only)
+        `worksheet` in one pass
+        """
+        values = {}
+        for row, cells in enumerate(worksheet.iter_rows(), 1):
+            for column, cell in enumerate(cells, 1):
+                if cell.value is not None:
+                    values[(row, column)] = cell.value
+        return cls(values)
+
+    def parse(self, formula):
+        """Parse `formula`, remembering the result for identical formulas"""
+        if formula not in self._parsed:
+            self._parsed[formula] = Parser(formula.lstrip('=')).parse()
+        return self._parsed[formula]
+
+    def resolve(self, row, column):
+        """Get the value of the cell at (`row`, `column`) as a float. Empty
+        cells are zero.
+        """
+        key = (row, column)
+        if key in self._resolved:
+            return self._resolved[key]
+        if key in self._resolving:
+            raise FormulaError("circular reference in %s" % (key,))
+        self._resolving.add(key)
+        try:
+            value = self.values.get(key)
+            if value is None:
+                result = 0.0
+            elif isinstance(value, (int, long, float)):
+                result = float(value)
+            elif isinstance(value, basestring):
+                result = self.evaluate(self.parse(value))
+            else:
+                raise FormulaError("%r in %s is not a number" % (value, key))
+        finally:
+            self._resolving.discard(key)
+        self._resolved[key] = result
+        return result
+
+    def resolve_row(self, row, min_col, max_col):
+        """Get the values of every cell in `row` from `min_col` to `max_col`
+        """
+        return [
+            self.resolve(row, column)
+            for column in range(min_col, max_col + 1)
+        ]
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == 'number':
+            return node[1]
+        elif kind == 'cells':
+            return sum(self.resolve(row, column) for row, column in node[1])
+        elif kind == 'negative':
+            return -self.evaluate(node[1])
+        elif kind == 'sum':
+            return sum(self.evaluate(argument) for argument in node[1])
+        left, right = self.evaluate(node[1]), self.evaluate(node[2])
+        if kind == '+':
+            return left + right
+        elif kind == '-':
+            return left - right
+        elif kind == '*':
+            return left * right
+        elif right == 0:
+            raise FormulaError("division by zero")
+        return left / right
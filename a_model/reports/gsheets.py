@@ -0,0 +1,251 @@
+"""Sync the local reports with their worksheets in the google spreadsheet.
+Rather than clearing a worksheet and writing all of it again, the cells of the
+local report are compared to the cells of the google worksheet and only the
+cells that differ are uploaded, a bounded batch at a time. After the first
+sync, that is usually just the last few months of a report, which is much
+faster for big reports like the profit and loss and stays well under the
+quotas of the google API. Requests that hit the quotas or a flaky connection
+are retried, waiting twice as long after every attempt.
+"""
+
+import os
+import re
+import json
+import time
+import socket
+
+from .. import utils
+from .formulas import FormulaResolver, FormulaError
+
+GDRIVE_SCOPE = ['https://spreadsheets.google.com/feeds']
+
+# the most cells to read or update in a single request
+BATCH_SIZE = 1000
+
+# how many times to try each request and how long to wait before the first
+# retry, in seconds
+MAX_ATTEMPTS = 5
+BACKOFF = 1.0
+
+# http statuses worth retrying: too many requests and errors on google's end
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# matches the value of every cell that isn't empty
+ANY_VALUE = re.compile(r'.', re.DOTALL)
+
+
+def open_workbook():
+    """Authorize with the credentials in dropbox and open the google
+    spreadsheet. The workbook can be shared by all of the reports, so this
+    only has to happen once for each sync.
+    """
+    import gspread
+    from oauth2client.client import SignedJwtAssertionCredentials
+
+    # read json from file
+    gdrive_credentials = os.path.join(utils.DROPBOX_ROOT, 'gdrive.json')
+    with open(gdrive_credentials) as stream:
+        key = json.load(stream)
+
+    # authorize with credentials
+    credentials = SignedJwtAssertionCredentials(
+        key['client_email'],
+        key['private_key'],
+        GDRIVE_SCOPE,
+    )
+    gdrive = with_retries(gspread.authorize, credentials)
+    return with_retries(gdrive.open_by_url, key['url'])
+
+
+def is_transient(error):
+    """Whether a request that failed with `error` may work if it is retried
+    """
+    import requests
+    from gspread.exceptions import RequestError
+
+    if isinstance(error, (socket.error, requests.ConnectionError,
+                          requests.Timeout)):
+        return True
+
+    # gspread puts the http status of failed requests first
+    if isinstance(error, RequestError) and error.args:
+        return error.args[0] in RETRY_STATUSES
+    return False
+
+
+def with_retries(function, *args, **kwargs):
+    """Call `function` with `args` and `kwargs`, and retry with an
+    exponential backoff whenever it fails with a transient error
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return function(*args, **kwargs)
+        except Exception as error:
+            if attempt + 1 == MAX_ATTEMPTS or not is_transient(error):
+                raise
+            delay = BACKOFF * 2 ** attempt
+            utils.print_err("%s; retrying in %g seconds" % (error, delay))
+            time.sleep(delay)
+
+
+def to_input_value(value):
+    """Get the input value of a google worksheet cell for the `value` of an
+    xlsx cell
+    """
+    if value is None:
+        return u''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return unicode(value)
+
+
+def is_same_value(local, remote):
+    """Whether the `local` and `remote` values are the same. Google
+    normalizes numbers, so that 1.0 comes back as 1, for instance.
+    """
+    if local == remote:
+        return True
+    try:
+        return float(local) == float(remote)
+    except (TypeError, ValueError):
+        return False
+
+
+def is_formula(value):
+    return value.startswith('=')
+
+
+def is_same_cell(local, remote):
+    """Whether the `local` and `remote` (input value, value) cells are the
+    same. Google gives formulas back in a different notation than xlsx files
+    (R1C1 rather than A1), so formulas are compared by their values instead.
+    """
+    local_input, local_value = local
+    remote_input, remote_value = remote
+    if is_formula(local_input):
+        return (
+            is_formula(remote_input) and local_value is not None and
+            is_same_value(local_value, remote_value)
+        )
+    return is_same_value(local_input, remote_input)
+
+
+def read_local_cells(worksheet):
+    """Get the {(row, column): (input value, value)} of every cell in the xlsx
+    `worksheet` that isn't empty, where the value of formulas is resolved (see
+    `FormulaResolver`) if possible
+    """
+    resolver = FormulaResolver.from_worksheet(worksheet)
+    cells = {}
+    for (row, column), value in resolver.values.iteritems():
+        input_value = to_input_value(value)
+        if not input_value:
+            continue
+        if is_formula(input_value):
+            try:
+                value = resolver.resolve(row, column)
+            except FormulaError:
+                value = None
+        cells[(row, column)] = (input_value, value)
+    return cells
+
+
+def read_remote_cells(worksheet):
+    """Get the {(row, column): (input value, value)} of every cell in the
+    google `worksheet` that isn't empty, all in one request
+    """
+    cells = {}
+    for cell in with_retries(worksheet.findall, ANY_VALUE):
+        value = cell.value
+        if cell.numeric_value is not None:
+            value = cell.numeric_value
+        cells[(cell.row, cell.col)] = (cell.input_value, value)
+    return cells
+
+
+def diff_cells(local, remote, full=False):
+    """Get the {(row, column): input value} of the cells that have to be
+    uploaded so that the google worksheet with the `remote` cells ends up
+    with the `local` cells, or of every cell that isn't empty in either of
+    them if `full`
+    """
+    empty = (u'', None)
+    changes = {}
+    for position in set(local) | set(remote):
+        cell = local.get(position, empty)
+        if full or not is_same_cell(cell, remote.get(position, empty)):
+            changes[position] = cell[0]
+    return changes
+
+
+def get_batches(changes, batch_size=BATCH_SIZE):
+    """Split the `changes` into batches of at most `batch_size` cells. Each
+    batch is the (first_row, first_col, last_row, last_col) range to read
+    and the positions of the changes in it.
+    """
+    columns = {}
+    for row, column in changes:
+        columns.setdefault(row, []).append(column)
+
+    # split up rows whose changes are too far apart to fit in one range
+    segments = []
+    for row in sorted(columns):
+        segment = []
+        for column in sorted(columns[row]):
+            if segment and column - segment[0] >= batch_size:
+                segments.append((row, segment))
+                segment = []
+            segment.append(column)
+        segments.append((row, segment))
+
+    # then put together as many of the segments as fit in each range
+    batches = []
+    for row, segment in segments:
+        if batches:
+            (first_row, first_col, _, last_col), positions = batches[-1]
+            first_col = min(first_col, segment[0])
+            last_col = max(last_col, segment[-1])
+            n_cells = (row - first_row + 1) * (last_col - first_col + 1)
+            if n_cells <= batch_size:
+                positions.extend((row, column) for column in segment)
+                batches[-1] = (
+                    (first_row, first_col, row, last_col), positions,
+                )
+                continue
+        batches.append((
+            (row, segment[0], row, segment[-1]),
+            [(row, column) for column in segment],
+        ))
+    return batches
+
+
+def sync_worksheet(worksheet, local, full=False, batch_size=BATCH_SIZE):
+    """Make the google `worksheet` match the `local` cells (see
+    `read_local_cells`) and return how many cells were uploaded
+    """
+    changes = diff_cells(local, read_remote_cells(worksheet), full)
+    if not changes:
+        return 0
+
+    # the worksheet has to be big enough for all of the local cells
+    n_rows = max(row for row, column in changes)
+    n_cols = max(column for row, column in changes)
+    if n_rows > worksheet.row_count or n_cols > worksheet.col_count:
+        with_retries(
+            worksheet.resize,
+            max(n_rows, worksheet.row_count),
+            max(n_cols, worksheet.col_count),
+        )
+
+    # updates need the cells from the worksheet, so every batch is read and
+    # then only its changed cells are sent back
+    for cell_range, positions in get_batches(changes, batch_size):
+        positions = set(positions)
+        cells = [
+            cell for cell in with_retries(worksheet.range, *cell_range)
+            if (cell.row, cell.col) in positions
+        ]
+        for cell in cells:
+            cell.value = changes[(cell.row, cell.col)]
+        with_retries(worksheet.update_cells, cells)
+    return len(changes)
@@ -0,0 +1,139 @@
+"""Merge the most recent months of a monthly report (like the profit and loss
+or the balance sheet, with a line for each account and a column for each
+month) into the full history of the report that is stored locally. This way,
+syncs only download the months that are new or may have been revised instead
+of the whole history every time.
+
+The merged report has the values of every cell rather than the formulas that
+quickbooks exports, since the formulas of the two reports refer to different
+rows and columns.
+"""
+
+import openpyxl
+
+from .. import months
+from .formulas import FormulaResolver, FormulaError
+
+# the row with the months of a monthly report. The rows above it are titles.
+HEADER_ROW = 5
+
+# the format of the months in the header of the merged report
+MONTH_FORMAT = '%b %Y'
+
+
+class MonthlyWorksheet(object):
+    """The `titles` above the header of a monthly report, the month ordinals
+    (see `months`) of its columns and the values of each of its `lines`, an
+    ordered list of (key, label, {month: value}) tuples. Lines are keyed by
+    their label and the number of lines above them with the same label.
+    """
+
+    def __init__(self, titles, months, lines):
+        self.titles = titles
+        self.months = months
+        self.lines = lines
+
+    @classmethod
+    def read(cls, report, filename, has_total=False):
+        """Read the monthly report in `filename`, where the last column is
+        the total of each line if `has_total`
+        """
+        workbook = openpyxl.load_workbook(filename, read_only=True)
+        try:
+            resolver = FormulaResolver.from_worksheet(workbook.active)
+        finally:
+            archive = getattr(workbook, '_archive', None)
+            if archive is not None:
+                archive.close()
+        values = resolver.values
+        max_row = max([row for row, column in values] or [0])
+        max_column = max([column for row, column in values] or [0])
+        if has_total:
+            max_column -= 1
+
+        titles = [values.get((row, 1)) for row in range(1, HEADER_ROW)]
+        columns = {}
+        for column in range(2, max_column + 1):
+            value = values.get((HEADER_ROW, column))
+            if value is not None:
+                date = report.get_date_from_value(value)
+                columns[column] = months.to_ordinal(date)
+
+        lines, n_labels = [], {}
+        for row in range(HEADER_ROW + 1, max_row + 1):
+            label = values.get((row, 1))
+            key = (label, n_labels.get(label, 0))
+            n_labels[label] = key[1] + 1
+            amounts = {}
+            for column, month in columns.iteritems():
+                if values.get((row, column)) is None:
+                    continue
+                try:
+                    amounts[month] = resolver.resolve(row, column)
+                except FormulaError:
+                    amounts[month] = values[(row, column)]
+            lines.append((key, label, amounts))
+        return cls(titles, sorted(columns.values()), lines)
+
+    def merge(self, recent):
+        """Merge the `recent` months of the report into this one. The recent
+        report has the final say for all of its months, and its lines keep
+        their order. Lines that are only in this report go after the line
+        above them here.
+        """
+        recent_months = set(recent.months)
+        merged_months = sorted(
+            set(month for month in self.months if month not in recent_months) |
+            recent_months
+        )
+
+        older_lines = dict((key, amounts) for key, _, amounts in self.lines)
+        lines = []
+        for key, label, amounts in recent.lines:
+            merged = dict(
+                (month, value)
+                for month, value in older_lines.get(key, {}).iteritems()
+                if month not in recent_months
+            )
+            merged.update(amounts)
+            lines.append((key, label, merged))
+
+        positions = dict((key, i) for i, (key, _, _) in enumerate(lines))
+        previous = None
+        for key, label, amounts in self.lines:
+            if key not in positions:
+                merged = dict(
+                    (month, value) for month, value in amounts.iteritems()
+                    if month not in recent_months
+                )
+                position = positions.get(previous, -1) + 1
+                lines.insert(position, (key, label, merged))
+                positions = dict((k, i) for i, (k, _, _) in enumerate(lines))
+            previous = key
+        return MonthlyWorksheet(recent.titles, merged_months, lines)
+
+    def save(self, stream, has_total=False):
+        """Save the report as an xlsx file to `stream`"""
+        # write-only workbooks don't record their dimensions, which the
+        # reports need to read them back in read-only mode
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        for title in self.titles:
+            worksheet.append([title])
+        header = [None] + [
+            months.from_ordinal(month).strftime(MONTH_FORMAT)
+            for month in self.months
+        ]
+        if has_total:
+            header.append('Total')
+        worksheet.append(header)
+        for key, label, amounts in self.lines:
+            row = [label] + [amounts.get(month) for month in self.months]
+            if has_total:
+                numbers = [
+                    value for value in amounts.itervalues()
+                    if isinstance(value, (int, long, float))
+                ]
+                row.append(sum(numbers) if numbers else None)
+            worksheet.append(row)
+        workbook.save(stream)
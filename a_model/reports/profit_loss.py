@@ -1,27 +1,33 @@
-import openpyxl
-
 from .base import Report
 
 
 class ProfitLoss(Report):
     report_name = 'profit_loss.xlsx'
     gsheet_tab_name = 'P&L'
+    incremental = True
+    has_total_column = True
 
     def get_historical_revenues(self):
+        return self.get_records()
+
+    def parse_records(self):
+        import openpyxl
         historical_revenues = []
-        worksheet = self.open_worksheet()
+        worksheet = self.open_worksheet(read_only=self.streaming)
 
         # exclude the first column (name of accounts) and last column (total)
         min_col = 'B'
         max_col = openpyxl.cell.get_column_letter(
-            worksheet.get_highest_column() - 1
+            worksheet.max_column - 1
         )
         date_cells = self.iter_cells_in_row(5, min_col, max_col)
-        income_cells = self.iter_cells_in_row(8, min_col, max_col)
+        income_cells = list(self.iter_cells_in_row(8, 'A', max_col))
+        account = income_cells.pop(0).value
         for date_cell, income_cell in zip(date_cells, income_cells):
             historical_revenues.append((
                 self.get_date_from_cell(date_cell),
                 self.get_float_from_cell(income_cell),
+                account,
             ))
         return historical_revenues
 
@@ -0,0 +1,92 @@
+import zipfile
+
+import numpy
+
+from .. import months
+
+# each record is the month it belongs to (see `months`), its amount and the
+# index of its source (the client or invoice it comes from) in the names of
+# the sources, so that a report with tens of thousands of lines stays small
+RECORD_DTYPE = numpy.dtype([
+    ('month', numpy.int32),
+    ('amount', float),
+    ('source', numpy.int32),
+])
+
+
+class Records(object):
+    """The records in a report as parallel arrays of `months`, `amounts` and
+    `sources`. Iterating over the records gives (date, amount) tuples, where
+    the date is the end of the month of each record.
+    """
+
+    def __init__(self, array, source_names):
+        self.array = array
+        self.source_names = list(source_names)
+
+    @classmethod
+    def from_tuples(cls, records):
+        """Make the records from a sequence of (date, amount, source) tuples
+        """
+        source_index = {}
+        source_names = []
+        array = numpy.zeros(len(records), dtype=RECORD_DTYPE)
+        if not len(records):
+            return cls(array, source_names)
+        dates, amounts, sources = zip(*records)
+        indices = []
+        for source in sources:
+            source = u'' if source is None else unicode(source).strip()
+            if source not in source_index:
+                source_index[source] = len(source_names)
+                source_names.append(source)
+            indices.append(source_index[source])
+        array['month'] = months.to_ordinals(dates)
+        array['amount'] = amounts
+        array['source'] = indices
+        return cls(array, source_names)
+
+    @classmethod
+    def load(cls, filename):
+        # numpy does not handle snapshots that were cut short very gracefully
+        if not zipfile.is_zipfile(filename):
+            raise ValueError("%s is not a snapshot of records" % filename)
+        with numpy.load(filename) as data:
+            array, source_names = data['records'], data['source_names']
+        if array.dtype != RECORD_DTYPE:
+            raise ValueError("%s has records of the wrong type" % filename)
+        return cls(array, source_names.tolist())
+
+    def save(self, stream):
+        numpy.savez(
+            stream,
+            records=self.array,
+            source_names=numpy.array(self.source_names, dtype=unicode),
+        )
+
+    @property
+    def months(self):
+        return self.array['month']
+
+    @property
+    def amounts(self):
+        return self.array['amount']
+
+    @property
+    def sources(self):
+        return self.array['source']
+
+    def get_source_names(self):
+        """Get the name of the source of every record"""
+        return [self.source_names[source] for source in self.sources]
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        month, amount, source = self.array[index]
+        return months.from_ordinal(month), float(amount)
+
+    def __iter__(self):
+        for month, amount in zip(self.months.tolist(), self.amounts.tolist()):
+            yield months.from_ordinal(month), amount
@@ -4,31 +4,30 @@ from .base import Report
 class UnpaidInvoices(Report):
     report_name = 'unpaid_invoices.xlsx'
 
-    def __init__(self, *args, **kwargs):
-        super(UnpaidInvoices, self).__init__()
-        self._cached_projected_payments = None
-
     def get_projected_payments(self):
-        if self._cached_projected_payments:
-            return self._cached_projected_payments
-        self._cached_projected_payments = projected_payments = []
-        worksheet = self.open_worksheet()
+        return self.get_records()
+
+    def parse_records(self):
+        projected_payments = []
+        worksheet = self.open_worksheet(read_only=self.streaming)
 
         min_row = 6
         max_row = worksheet.max_row - 4
-        date_cells = self.iter_cells_in_column('G', min_row, max_row)
-        balance_cells = self.iter_cells_in_column('I', min_row, max_row)
-        for date_cell, balance_cell in zip(date_cells, balance_cells):
+        # read the invoice number ('Num' column D), date (G) and balance (I)
+        # of each row in one pass, rather than streaming the file once for
+        # each column
+        cell_range = 'D%(min_row)d:I%(max_row)d' % locals()
+        for row in worksheet.iter_rows(cell_range):
+            invoice_cell, date_cell, balance_cell = row[0], row[3], row[5]
             projected_payments.append((
                 self.get_date_from_cell(date_cell),
                 self.get_float_from_cell(balance_cell),
+                invoice_cell.value,
             ))
         return projected_payments
 
     def __iter__(self):
-        projected_payments = self.get_projected_payments()
-        for date, balance in projected_payments:
-            yield date, balance
+        return iter(self.get_projected_payments())
 
     def get_qbo_query_params(self):
         return (
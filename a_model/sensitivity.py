@@ -0,0 +1,100 @@
+"""Sensitivity analysis of Datascope's outcomes to the parameters in config.ini
+that affect cash. All of these parameters enter the cash in the bank linearly
+after revenues are drawn, so an entire grid of parameters is evaluated against
+one shared set of simulated revenues by broadcasting.
+"""
+
+import collections
+import warnings
+
+import numpy
+
+from . import simulation
+
+# the parameters from the [parameters] section of config.ini that can be varied
+PARAMETERS = (
+    'fixed_monthly_costs',
+    'per_datascoper_costs',
+    'line_of_credit',
+    'n_months_buffer',
+)
+
+# maximum number of (grid point x universe x month) cash values to have in
+# memory at once
+MAX_CHUNK_SIZE = 10**7
+
+
+def get_grid(ranges):
+    """Expand `ranges`, an ordered mapping of parameter names to the values to
+    try, into every combination of values. Returns an ordered mapping of
+    parameter names to an array of the value at each point in the grid.
+    """
+    for name in ranges:
+        if name not in PARAMETERS:
+            raise ValueError((
+                "'%s' is not a parameter that can be varied. Choose from: %s"
+            ) % (name, ', '.join(PARAMETERS)))
+    values = numpy.meshgrid(
+        *[numpy.asarray(ranges[name], float) for name in ranges],
+        indexing='ij'
+    )
+    return collections.OrderedDict(
+        (name, value.ravel()) for name, value in zip(ranges, values)
+    )
+
+
+def evaluate_grid(revenues, cash_in_bank, n_people, bonus_goal, parameters,
+                  grid):
+    """Evaluate the outcomes in the last month of the (n_universes x n_months)
+    `revenues` at every point in the `grid`. `parameters` are the baseline
+    values of all of the `PARAMETERS`, which are overridden by the values in
+    the `grid`, and `bonus_goal` is the cash we want on top of the buffer in
+    the last month. Returns the (n_points x len(OUTCOMES)) probability of each
+    outcome and the median cash in the last month at each point.
+    """
+    n_points = len(grid.values()[0]) if grid else 1
+    values = dict(
+        (name, numpy.ones(n_points) * parameters[name]) for name in PARAMETERS
+    )
+    values.update(grid)
+    costs = values['fixed_monthly_costs'] + \
+        values['per_datascoper_costs'] * n_people
+    cash_buffer = values['n_months_buffer'] * costs
+    thresholds = numpy.vstack([
+        -values['line_of_credit'],
+        numpy.zeros(n_points),
+        cash_buffer,
+        cash_buffer + bonus_goal,
+    ]).T
+
+    # the cash in every universe is the same up to the costs, which only
+    # depend on the point in the grid
+    n_universes, n_months = revenues.shape
+    received = numpy.cumsum(revenues, axis=1)
+    spent = numpy.arange(1, n_months + 1)
+    chunk_size = max(1, MAX_CHUNK_SIZE // max(1, revenues.size))
+    last_month_cash = numpy.zeros((n_points, n_universes))
+    for start in range(0, n_points, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        monthly_cash = cash_in_bank + received - \
+            costs[chunk, numpy.newaxis, numpy.newaxis] * spent
+        line_of_credit = values['line_of_credit'][chunk]
+        before_revenues = monthly_cash - revenues
+        bankrupt = numpy.any(
+            before_revenues < -line_of_credit[:, numpy.newaxis, numpy.newaxis],
+            axis=2,
+        )
+        last_month_cash[chunk] = numpy.where(
+            bankrupt, numpy.nan, monthly_cash[:, :, -1],
+        )
+
+    # points in the grid play the role of months to classify all of the
+    # universes at every point in one go
+    outcomes = simulation.classify_outcomes(last_month_cash.T, thresholds)
+    probabilities = simulation.get_outcome_probabilities(outcomes)
+
+    # points where every universe ran out of credit have no median cash
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median_cash = numpy.nanmedian(last_month_cash, axis=1)
+    return probabilities, median_cash
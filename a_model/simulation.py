@@ -0,0 +1,293 @@
+"""Array-based Monte Carlo engine for simulating Datascope's finances. Rather
+than walking through the universes one at a time, every universe is simulated
+at once as a row of an (n_universes x n_months) array.
+
+To make simulations reproducible and splittable across processes, universes
+are simulated in blocks of `BLOCK_SIZE` universes and every block draws from
+its own random stream that is spawned from a master seed. The results for a
+given master seed are therefore identical regardless of how many workers the
+blocks are divided among.
+"""
+
+import multiprocessing
+import math
+
+import numpy
+
+# clients rarely pay early and tend to pay late and the end of projects can
+# sometimes drag on a bit, delaying payment. These are the (inclusive) upper
+# bounds on the number of months of delay from each source of noise.
+# TODO: can measure these and make them a not crappy model
+MAX_ONTIME_NOISE = 3
+MAX_WORK_COMPLETION_NOISE = 2
+
+# the possible outcomes in any given month, from best to worst
+OUTCOMES = ('goal', 'buffer', 'no bonus', 'squeak by', 'bye bye')
+
+# number of universes that share a random stream
+BLOCK_SIZE = 100
+
+# smallest batch of universes to simulate at a time when simulating until the
+# results converge
+MIN_BATCH_SIZE = 2 * BLOCK_SIZE
+
+# master seed for the universes unless another one is given. the same inputs
+# give the same universes from run to run, so they only have to be simulated
+# once (see `store.ResultStore`)
+DEFAULT_SEED = 0
+
+
+def get_random_state(seed=None):
+    """Convenience function for getting a numpy RandomState from a seed (or
+    passing through a RandomState that already exists)
+    """
+    if isinstance(seed, numpy.random.RandomState):
+        return seed
+    return numpy.random.RandomState(seed)
+
+
+def spawn_random_state(master_seed, block):
+    """Spawn the independent random stream for `block` from the master seed.
+    This only depends on the master seed and the block number, so any block
+    can be simulated on its own in any process.
+    """
+    return numpy.random.RandomState([master_seed, block])
+
+
+def iter_blocks(n_universes, first_block=0, block_size=BLOCK_SIZE):
+    """Iterate over the number of each block and the number of universes in
+    that block, starting from `first_block`
+    """
+    for block, start in enumerate(range(0, n_universes, block_size)):
+        yield first_block + block, min(block_size, n_universes - start)
+
+
+def ontime_noise(random_state, size):
+    """Clients rarely pay early and tend to pay late"""
+    return random_state.randint(0, MAX_ONTIME_NOISE + 1, size=size)
+
+
+def work_completion_noise(random_state, size):
+    """The end of projects can sometimes drag on a bit, delaying payment."""
+    return random_state.randint(0, MAX_WORK_COMPLETION_NOISE + 1, size=size)
+
+
+def _scatter_add(revenues, months, balances):
+    """Add the `balances` into the (n_universes x n_months) `revenues` array
+    in the month that each payment arrives in each universe. Payments that
+    arrive outside of the simulation time window are ignored.
+    """
+    n_universes, n_months = revenues.shape
+    in_window = (months >= 0) & (months < n_months)
+    universes = numpy.arange(n_universes)[:, numpy.newaxis]
+    index = (universes * n_months + months)[in_window]
+    balances = numpy.asarray(balances, float)
+    weights = numpy.broadcast_to(balances, months.shape)[in_window]
+    revenues += numpy.bincount(
+        index, weights=weights, minlength=revenues.size,
+    ).reshape(revenues.shape)
+
+
+def simulate_revenues(invoice_months, invoice_balances,
+                      projection_months, projection_balances,
+                      n_months, n_universes, random_state=None):
+    """Simulate the revenues for `n_universes` universes at once. The
+    `*_months` arrays are the number of months from now that each unpaid
+    invoice and projected revenue is due. Returns an (n_universes x n_months)
+    array of the revenue that arrives in each month of each universe.
+    """
+    random_state = get_random_state(random_state)
+    revenues = numpy.zeros((n_universes, n_months))
+
+    # we are presumably actively bugging people about overdue invoices, so
+    # these should be paid relatively soon. The biggest question here is
+    # whether people will pay on time.
+    invoice_months = numpy.maximum(0, numpy.asarray(invoice_months, int))
+    size = (n_universes, len(invoice_months))
+    months = invoice_months + ontime_noise(random_state, size)
+    _scatter_add(revenues, months, invoice_balances)
+
+    # revenue from projects in progress has two sources of variability: (i)
+    # whether the work is deemed done in time to receive payment by the
+    # specified date and (ii) whether our clients pay on time.
+    projection_months = numpy.asarray(projection_months, int)
+    size = (n_universes, len(projection_months))
+    months = projection_months + \
+        work_completion_noise(random_state, size) + \
+        ontime_noise(random_state, size)
+    _scatter_add(revenues, months, projection_balances)
+
+    return revenues
+
+
+def _simulate_revenue_shard(args):
+    """Simulate the revenues for a shard of blocks of universes. This is a
+    module level function so that it can be pickled for a process pool.
+    """
+    payments, n_months, master_seed, blocks = args
+    revenues = []
+    for block, n_universes in blocks:
+        random_state = spawn_random_state(master_seed, block)
+        revenues.append(simulate_revenues(
+            *payments,
+            n_months=n_months,
+            n_universes=n_universes,
+            random_state=random_state
+        ))
+    return numpy.vstack(revenues)
+
+
+def simulate_revenues_in_blocks(payments, n_months, n_universes, master_seed,
+                                n_workers=1, first_block=0):
+    """Simulate the revenues for `n_universes` universes by sharding blocks of
+    universes across `n_workers` processes (all cores when `n_workers` is
+    None) and merging the results in block order. `payments` is the tuple of
+    the first four arguments to `simulate_revenues`. Simulating more
+    universes later on can pick up where this left off with `first_block`.
+    """
+    blocks = list(iter_blocks(n_universes, first_block=first_block))
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+    n_workers = max(1, min(n_workers, len(blocks)))
+    shards = [
+        (payments, n_months, master_seed, [blocks[i] for i in indices])
+        for indices in numpy.array_split(range(len(blocks)), n_workers)
+    ]
+
+    # no need to pay for spinning up processes if there is only one shard
+    if n_workers == 1:
+        return _simulate_revenue_shard(shards[0])
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        revenues = pool.map(_simulate_revenue_shard, shards)
+    finally:
+        pool.close()
+        pool.join()
+    return numpy.vstack(revenues)
+
+
+def simulate_monthly_cash(revenues, cash_in_bank, costs, line_of_credit):
+    """Calculate the cash in the bank at the end of every month from an
+    (n_universes x n_months) array of `revenues`. `costs` is either the
+    monthly costs or an array of the costs in each month. Once a universe
+    exhausts the line of credit, the cash in every remaining month is NaN.
+    """
+    n_universes, n_months = revenues.shape
+    spent = numpy.cumsum(numpy.ones(n_months) * costs)
+    monthly_cash = cash_in_bank - spent + numpy.cumsum(revenues, axis=1)
+
+    # we go bust if we are beyond our line of credit after paying the bills
+    # and before any revenue arrives that month
+    bankrupt = numpy.logical_or.accumulate(
+        monthly_cash - revenues < -line_of_credit, axis=1,
+    )
+    monthly_cash[bankrupt] = numpy.nan
+    return monthly_cash
+
+
+def as_monthly_cash_array(monthly_cash_outcomes, n_months=None):
+    """Convert a list of lists of the monthly cash in each universe into an
+    (n_universes x n_months) array. Universes that ran out of credit early
+    have shorter lists, so their remaining months are padded with NaN.
+    """
+    if isinstance(monthly_cash_outcomes, numpy.ndarray):
+        monthly_cash = monthly_cash_outcomes.astype(float)
+        if n_months is not None and monthly_cash.shape[1] < n_months:
+            padding = numpy.nan * numpy.ones((
+                monthly_cash.shape[0], n_months - monthly_cash.shape[1],
+            ))
+            monthly_cash = numpy.hstack([monthly_cash, padding])
+        return monthly_cash
+    if n_months is None:
+        n_months = max([0] + [len(cash) for cash in monthly_cash_outcomes])
+    monthly_cash = numpy.nan * numpy.ones((
+        len(monthly_cash_outcomes), n_months,
+    ))
+    for universe, cash in enumerate(monthly_cash_outcomes):
+        cash = cash[:n_months]
+        monthly_cash[universe, :len(cash)] = cash
+    return monthly_cash
+
+
+def classify_outcomes(monthly_cash, thresholds):
+    """Classify the cash in every month of every universe in one pass.
+    `thresholds` is an (n_months x 4) array of the sorted cash thresholds
+    between the `OUTCOMES` in each month, from the line of credit up to the
+    cash goal. Returns an (n_universes x n_months) array of indices into
+    `OUTCOMES`. Months after running out of credit (NaN) are 'bye bye'.
+    """
+    cash = numpy.where(numpy.isnan(monthly_cash), -numpy.inf, monthly_cash)
+    n_thresholds_beat = numpy.sum(
+        cash[:, :, numpy.newaxis] > thresholds[numpy.newaxis, :, :], axis=2,
+    )
+    return len(OUTCOMES) - 1 - n_thresholds_beat
+
+
+def count_outcomes(outcomes, weights=None):
+    """Count the (n_months x len(OUTCOMES)) number of universes with each
+    outcome in each month from an array of outcomes from `classify_outcomes`.
+    Each universe can optionally be given an array of `weights` instead.
+    """
+    n_universes, n_months = outcomes.shape
+    n_outcomes = len(OUTCOMES)
+    index = numpy.arange(n_months) * n_outcomes + outcomes
+    if weights is not None:
+        weights = numpy.ravel(weights)
+    return numpy.bincount(
+        index.ravel(), weights=weights, minlength=n_months * n_outcomes,
+    ).reshape(n_months, n_outcomes)
+
+
+def get_outcome_probabilities(outcomes):
+    """Tabulate the (n_months x len(OUTCOMES)) probability of each outcome in
+    each month from an array of outcomes from `classify_outcomes`
+    """
+    return count_outcomes(outcomes) / float(max(1, outcomes.shape[0]))
+
+
+def z_score(confidence):
+    """Number of standard deviations that covers `confidence` of a normal
+    distribution (e.g., 1.96 for 0.95)
+    """
+    low, high = 0.0, 10.0
+    while high - low > 1e-9:
+        z = (low + high) / 2
+        if math.erf(z / math.sqrt(2)) < confidence:
+            low = z
+        else:
+            high = z
+    return (low + high) / 2
+
+
+def proportion_half_widths(probabilities, n_universes, z):
+    """Half-width of the Wilson score interval on outcome `probabilities`
+    that were estimated from `n_universes` universes. Unlike the normal
+    approximation, this does not collapse to zero for rare outcomes that have
+    not been observed yet.
+    """
+    n, p = float(n_universes), probabilities
+    return z / (n + z**2) * numpy.sqrt(n * p * (1 - p) + z**2 / 4)
+
+
+def median_half_widths(monthly_cash, z):
+    """Half-width of the distribution-free confidence interval on the median
+    cash in each month, based on the ranks of the order statistics. Universes
+    that ran out of credit are treated as having infinitely negative cash, so
+    the interval is zero when the whole interval ran out of credit. When only
+    the bottom of the interval ran out of credit, the median may be bankrupt
+    and its cash has no meaningful interval. Those months are NaN, and it is
+    up to the probability of running out of credit ('bye bye' in `OUTCOMES`)
+    to converge instead.
+    """
+    n_universes = monthly_cash.shape[0]
+    cash = numpy.where(numpy.isnan(monthly_cash), -numpy.inf, monthly_cash)
+    spread = z * math.sqrt(n_universes) / 2
+    low = max(0, int(math.floor(n_universes / 2.0 - spread)))
+    high = min(n_universes - 1, int(math.ceil(n_universes / 2.0 + spread)))
+    ranked = numpy.partition(cash, [low, high], axis=0)
+    lower, upper = ranked[low], ranked[high]
+    with numpy.errstate(invalid='ignore'):
+        half_widths = (upper - lower) / 2
+    half_widths[lower == upper] = 0.0
+    half_widths[numpy.isneginf(lower) & numpy.isfinite(upper)] = numpy.nan
+    return half_widths
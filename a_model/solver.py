@@ -0,0 +1,177 @@
+"""Goal-seeking solvers that search for the most people we can hire, the most
+take-home pay we can target, or the least we can charge for new people while
+keeping the risks in `simulation.OUTCOMES` within constraints, like
+P(bye bye) <= 5% every month through the end of the year.
+
+Revenues do not depend on any of these, so every step of a search reuses the
+same simulated revenues and the whole search costs about as much as a single
+simulation.
+"""
+
+import numpy
+
+from . import simulation
+from . import months
+
+
+def meets_constraints(outcome_table, max_probabilities=None,
+                      min_probabilities=None):
+    """Check whether the (n_months x n_outcomes) `outcome_table` keeps the
+    probability of each outcome in `max_probabilities` *or worse* at or below
+    its maximum and each outcome in `min_probabilities` *or better* at or
+    above its minimum in every month. Outcomes are cumulative like this so
+    that, for example, capping 'squeak by' can't be met by going 'bye bye'.
+    """
+    at_least_as_good = numpy.cumsum(outcome_table, axis=1)
+    at_least_as_bad = numpy.cumsum(outcome_table[:, ::-1], axis=1)[:, ::-1]
+    for outcome, probability in (max_probabilities or {}).iteritems():
+        column = simulation.OUTCOMES.index(outcome)
+        if numpy.any(at_least_as_bad[:, column] > probability):
+            return False
+    for outcome, probability in (min_probabilities or {}).iteritems():
+        column = simulation.OUTCOMES.index(outcome)
+        if numpy.any(at_least_as_good[:, column] < probability):
+            return False
+    return True
+
+
+def search_largest(is_feasible, low, high, tolerance=None):
+    """Find the largest value between `low` and `high` for which
+    `is_feasible` is true, assuming that everything below a feasible value is
+    feasible too. This searches integers unless a `tolerance` is given.
+    Returns None if not even `low` is feasible.
+    """
+    if not is_feasible(low):
+        return None
+    if is_feasible(high):
+        return high
+    while high - low > (tolerance or 1):
+        middle = (low + high) / 2.0 if tolerance else (low + high) // 2
+        if is_feasible(middle):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def search_smallest(is_feasible, low, high, tolerance=None):
+    """Find the smallest value between `low` and `high` for which
+    `is_feasible` is true, assuming that everything above a feasible value is
+    feasible too. Returns None if not even `high` is feasible.
+    """
+    value = search_largest(
+        lambda x: is_feasible(-x), -high, -low, tolerance=tolerance,
+    )
+    return None if value is None else -value
+
+
+class Solver(object):
+    """Searches for extreme values that meet risk constraints through `month`
+    months from now (the end of the year by default), evaluating every step
+    of the search against one set of simulated revenues
+    """
+
+    def __init__(self, datascope, month=None, n_universes=1000,
+                 seed=simulation.DEFAULT_SEED, n_workers=1):
+        if month is None:
+            month = datascope.get_end_of_year_month()
+        self.n_months = month + 1
+        self.team = datascope.get_team()
+        self.parameters = datascope.parameters
+        self.cash_in_bank = datascope.balance_sheet.get_current_cash_in_bank()
+        self.revenues = datascope.get_revenues(
+            self.n_months, n_universes, seed, n_workers=n_workers,
+        )
+
+        # the month of the year for each month, since the cash we want for
+        # bonuses grows as the year goes on
+        self.months_of_year = months.month_of_year(
+            months.last_month() + 1 + numpy.arange(self.n_months)
+        )
+
+    def get_outcome_table(self, team, costs):
+        """Get the (n_months x n_outcomes) probability of each outcome in each
+        month for `team`, given its `costs` in each month
+        """
+        monthly_cash = simulation.simulate_monthly_cash(
+            self.revenues, self.cash_in_bank, costs,
+            self.parameters.line_of_credit,
+        )
+        cash_buffer = self.parameters.n_months_buffer * team.costs()
+        bonus_goal = self.months_of_year * team.after_tax_target_profit()
+        thresholds = numpy.vstack([
+            -self.parameters.line_of_credit * numpy.ones(self.n_months),
+            numpy.zeros(self.n_months),
+            cash_buffer * numpy.ones(self.n_months),
+            cash_buffer + bonus_goal,
+        ]).T
+        outcomes = simulation.classify_outcomes(monthly_cash, thresholds)
+        return simulation.get_outcome_probabilities(outcomes)
+
+    def _get_hiring_costs(self, n_hires, start_month, net_cost_per_hire):
+        n_hired = n_hires * (numpy.arange(self.n_months) >= start_month)
+        return self.team.costs() + net_cost_per_hire * n_hired
+
+    def max_hires(self, max_probabilities=None, min_probabilities=None,
+                  start_month=0, max_hires=50):
+        """Find the most people we can hire `start_month` months from now
+        while meeting the constraints. Returns None if the current team does
+        not meet the constraints.
+        """
+        def is_feasible(n_hires):
+            team = self.team.with_new_hires(n_hires)
+            costs = self._get_hiring_costs(
+                n_hires, start_month, self.parameters.per_datascoper_costs,
+            )
+            return meets_constraints(
+                self.get_outcome_table(team, costs),
+                max_probabilities, min_probabilities,
+            )
+        return search_largest(is_feasible, 0, max_hires)
+
+    def max_take_home_pay(self, max_probabilities=None,
+                          min_probabilities=None, tolerance=0.001,
+                          max_scale=10.0):
+        """Find the largest factor that we can scale everyone's take-home pay
+        targets by while meeting the constraints (typically a minimum
+        probability of reaching our 'goal'). Returns the factor and the
+        corresponding take-home pay targets, or None if not even a tiny
+        fraction of the current targets meets the constraints.
+        """
+        costs = self.team.costs()
+
+        def is_feasible(scale):
+            team = self.team.batch(
+                after_tax_target_salary=scale*self.team.after_tax_target_salary
+            )
+            return meets_constraints(
+                self.get_outcome_table(team, costs),
+                max_probabilities, min_probabilities,
+            )
+        scale = search_largest(is_feasible, tolerance, max_scale, tolerance)
+        if scale is None:
+            return None
+        return scale, scale * self.team.after_tax_target_salary
+
+    def min_hourly_rate(self, n_hires, max_probabilities=None,
+                        min_probabilities=None, start_month=0, tolerance=1.0,
+                        max_rate=1000.0):
+        """Find the lowest hourly rate that we can charge for the time of
+        `n_hires` new people while meeting the constraints. New people bill
+        `billable_hours_per_year` and their billings are assumed to arrive
+        every month from when they start. Returns None if not even
+        `max_rate` meets the constraints.
+        """
+        team = self.team.with_new_hires(n_hires)
+        monthly_hours = self.parameters.billable_hours_per_year / 12
+
+        def is_feasible(rate):
+            costs = self._get_hiring_costs(
+                n_hires, start_month,
+                self.parameters.per_datascoper_costs - rate * monthly_hours,
+            )
+            return meets_constraints(
+                self.get_outcome_table(team, costs),
+                max_probabilities, min_probabilities,
+            )
+        return search_smallest(is_feasible, 0.0, max_rate, tolerance)
@@ -0,0 +1,151 @@
+"""On-disk store for batches of simulated revenues. Rather than pickling every
+universe into a file of its own, a whole batch of universes is one binary
+array file that is memory-mapped when it is read back. An index maps the
+(input fingerprint, seed, n_months) of each batch to its file.
+
+Universes are simulated in independent blocks (see `simulation`), so a batch
+with more universes also answers requests for fewer of them, and a batch can
+be extended with more blocks later on without resimulating the ones that are
+already stored.
+"""
+
+import os
+import json
+import hashlib
+
+import numpy
+
+from . import utils
+from . import simulation
+from . import cache as cache_module
+from .decorators import fingerprint, code_version
+
+
+def get_payments_fingerprint(payments):
+    """Fingerprint the tuple of scheduled `payments` (see
+    `Datascope.get_scheduled_payments`) together with the version of the code
+    that simulates revenues from them
+    """
+    m = hashlib.sha1(code_version(simulation.simulate_revenues))
+    m.update(fingerprint(payments))
+    return m.hexdigest()
+
+
+class ResultStore(object):
+    """Batches of simulated (n_universes x n_months) revenues in `root`"""
+
+    index_basename = 'index.json'
+
+    def __init__(self, root=None, cache=cache_module.default_cache):
+        if root is None:
+            root = os.path.join(utils.DATA_ROOT, 'revenues')
+        self.root = root
+        self.cache = cache
+
+        # batches expire and are evicted along with the rest of the cache
+        self.cache.add_directory(self.root)
+        self.index_filename = os.path.join(self.root, self.index_basename)
+
+    @staticmethod
+    def get_key(input_fingerprint, seed, n_months):
+        return '%s-%s-%d' % (input_fingerprint, seed, n_months)
+
+    def read_index(self):
+        if not os.path.exists(self.index_filename):
+            return {}
+        # a damaged index only means that the batches have to be simulated
+        # again
+        try:
+            with open(self.index_filename) as stream:
+                return json.load(stream)
+        except ValueError:
+            return {}
+
+    def write_index(self, index):
+        cache_module.atomic_write(
+            self.index_filename,
+            lambda stream: json.dump(index, stream, indent=1, sort_keys=True),
+        )
+
+    def lock(self, input_fingerprint, seed, n_months):
+        """Hold the lock for the batch for these inputs (see `Cache.lock`)"""
+        key = self.get_key(input_fingerprint, seed, n_months)
+        return self.cache.lock('revenues-' + key)
+
+    def load(self, input_fingerprint, seed, n_months, count_miss=True):
+        """Memory-map the batch of revenues for these inputs, or return None
+        if nothing has been stored for them yet. Like `Cache.get`, a batch
+        that is looked up again after taking the lock doesn't count as
+        another miss when `count_miss` is False.
+        """
+        self.cache.cleanup_once()
+        key = self.get_key(input_fingerprint, seed, n_months)
+        entry = self.read_index().get(key)
+        filename = None
+        if entry is not None:
+            filename = os.path.join(self.root, entry['filename'])
+
+        # batches may have expired or been evicted by the cache
+        revenues = None
+        if filename is not None and self.cache.is_current(filename):
+            revenues = self._read(filename, entry['n_universes'])
+        if revenues is None:
+            if count_miss:
+                self.cache.stats['misses'] += 1
+            return None
+        self.cache.touch(filename)
+        self.cache.stats['disk hits'] += 1
+        self.cache.record_read(revenues.nbytes)
+        return revenues
+
+    def _read(self, filename, n_universes):
+        # the file can disappear if another process evicts it, and files
+        # that are corrupt are removed to be simulated again
+        try:
+            revenues = numpy.load(filename, mmap_mode='r')
+        except (IOError, OSError):
+            return None
+        except ValueError:
+            self.cache.record_corrupt(filename)
+            return None
+        if revenues.ndim != 2 or len(revenues) != n_universes:
+            self.cache.record_corrupt(filename)
+            return None
+        return revenues
+
+    def save(self, input_fingerprint, seed, n_months, revenues):
+        """Store the batch of `revenues` for these inputs, replacing any batch
+        that was stored for them before
+        """
+        self.cache.cleanup_once()
+        cache_module.makedirs(self.root)
+        key = self.get_key(input_fingerprint, seed, n_months)
+
+        # every batch gets a new file rather than overwriting the old one,
+        # which may still be memory-mapped
+        basename = '%s-%d.npy' % (key, len(revenues))
+        filename = os.path.join(self.root, basename)
+        cache_module.atomic_write(
+            filename, lambda stream: numpy.save(stream, revenues),
+        )
+        self.cache.record_write(os.path.getsize(filename))
+
+        # other processes may be adding batches for other keys at the same time
+        with self.cache.lock('revenues-index'):
+            index = self.read_index()
+            previous = index.get(key)
+            index[key] = {'filename': basename, 'n_universes': len(revenues)}
+            if previous is not None and previous['filename'] != basename:
+                previous_filename = os.path.join(
+                    self.root, previous['filename'],
+                )
+                if os.path.exists(previous_filename):
+                    os.remove(previous_filename)
+
+            # forget the batches that the cache evicted or that expired
+            self.cache.enforce_disk_budget()
+            for other_key, entry in index.items():
+                filename = os.path.join(self.root, entry['filename'])
+                if not os.path.exists(filename):
+                    del index[other_key]
+            self.write_index(index)
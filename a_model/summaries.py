@@ -0,0 +1,180 @@
+"""Plain text and JSON summaries of the simulations. The plotting stack
+(matplotlib, seaborn, pandas) takes seconds to import, so the scripts can
+print one of these summaries instead of drawing a graph without ever importing
+it.
+"""
+
+import json
+import collections
+
+import numpy
+
+from . import utils
+from .simulation import OUTCOMES
+
+FORMATS = ('text', 'json')
+
+# the percentiles of the cash in the bank and of everyone's bonus to show
+CASH_PERCENTILES = (5, 50, 95)
+BONUS_PERCENTILES = (10, 50, 90)
+
+
+def _is_missing(value):
+    return isinstance(value, float) and not numpy.isfinite(value)
+
+
+def _format_value(value, kind):
+    if _is_missing(value):
+        return '-'
+    elif kind == 'currency':
+        return utils.currency_str(value)
+    elif kind == 'percent':
+        return '{:.1%}'.format(value)
+    return str(value)
+
+
+class Summary(object):
+    """A table of results with a `kind` of value in each column ('currency',
+    'percent' or anything else to print the value as is)
+    """
+
+    def __init__(self, title, columns, kinds):
+        self.title = title
+        self.columns = columns
+        self.kinds = kinds
+        self.rows = []
+
+    def add_row(self, *values):
+        self.rows.append(values)
+
+    def to_json(self):
+        return json.dumps(collections.OrderedDict([
+            ('title', self.title),
+            ('rows', [
+                collections.OrderedDict(
+                    (column, None if _is_missing(value) else value)
+                    for column, value in zip(self.columns, row)
+                )
+                for row in self.rows
+            ]),
+        ]), indent=2, default=str)
+
+    def to_text(self):
+        lines = [self.title, '']
+        lines.append(''.join('%16s' % column for column in self.columns))
+        for row in self.rows:
+            lines.append(''.join(
+                '%16s' % _format_value(value, kind)
+                for value, kind in zip(row, self.kinds)
+            ))
+        return '\n'.join(lines)
+
+    def show(self, format='text'):
+        if format == 'json':
+            print self.to_json()
+        else:
+            print self.to_text()
+
+
+def get_cash_summary(datascope, monthly_cash_outcomes):
+    """Summarize the distribution of the cash in the bank and the probability
+    of each outcome at the end of every month
+    """
+    monthly_cash = numpy.asarray(monthly_cash_outcomes, float)
+    outcome_table = datascope.get_outcome_table(monthly_cash)
+
+    # universes that ran out of credit are at the bottom of the distribution
+    cash = numpy.where(numpy.isnan(monthly_cash), -numpy.inf, monthly_cash)
+    percentiles = numpy.percentile(cash, CASH_PERCENTILES, axis=0)
+    return _get_cash_summary(datascope, percentiles, outcome_table)
+
+
+def get_exact_cash_summary(datascope, cash_distribution):
+    """Like `get_cash_summary`, from the distribution of the cash in the bank
+    (see `exact.CashDistribution`) instead of simulated universes
+    """
+    n_months = len(cash_distribution.values)
+    outcome_table = cash_distribution.get_outcome_probabilities(
+        datascope.get_outcome_thresholds(range(n_months)),
+    )
+    percentiles = cash_distribution.get_quantiles(
+        numpy.divide(CASH_PERCENTILES, 100.0),
+    )
+    return _get_cash_summary(datascope, percentiles, outcome_table)
+
+
+def _get_cash_summary(datascope, percentiles, outcome_table):
+    summary = Summary(
+        'CASH IN BANK',
+        ['month', '5%', 'median', '95%'] + list(OUTCOMES),
+        ['date'] + ['currency'] * 3 + ['percent'] * len(OUTCOMES),
+    )
+    months = datascope.iter_future_months(len(outcome_table))
+    for month, date in enumerate(months):
+        summary.add_row(*(
+            [date] + list(percentiles[:, month]) + list(outcome_table[month])
+        ))
+    return summary
+
+
+def get_bonus_summary(datascope, monthly_cash_outcomes, month):
+    """Summarize everyone's bonus and dividends from the cash in the bank
+    `month` months from now
+    """
+    monthly_cash = numpy.asarray(monthly_cash_outcomes, float)
+    cash_buffer = datascope.n_months_buffer * datascope.costs()
+    profit = numpy.nan_to_num(monthly_cash[:, month] - cash_buffer)
+
+    def get_percentiles(person):
+        bonuses = numpy.maximum(0, profit * person.net_fraction_of_profits())
+        return numpy.percentile(bonuses, BONUS_PERCENTILES)
+    return _get_bonus_summary(datascope, get_percentiles)
+
+
+def get_exact_bonus_summary(datascope, cash_distribution, month):
+    """Like `get_bonus_summary`, from the distribution of the cash in the
+    bank (see `exact.CashDistribution`) instead of simulated universes
+    """
+    cash = cash_distribution.get_quantiles(
+        numpy.divide(BONUS_PERCENTILES, 100.0),
+    )[:, month]
+    cash_buffer = datascope.n_months_buffer * datascope.costs()
+    profit = numpy.nan_to_num(cash - cash_buffer)
+
+    # everyone's bonus goes up with the cash, so the percentiles of the
+    # bonuses are the bonuses at the percentiles of the cash
+    def get_percentiles(person):
+        return numpy.maximum(0, profit * person.net_fraction_of_profits())
+    return _get_bonus_summary(datascope, get_percentiles)
+
+
+def _get_bonus_summary(datascope, get_percentiles):
+    summary = Summary(
+        'DIVIDEND + PRE-TAX BONUS',
+        ['person', '10%', 'median', '90%', 'goal'],
+        ['name'] + ['currency'] * 4,
+    )
+    for person in datascope:
+        summary.add_row(*(
+            [person.name] + list(get_percentiles(person)) +
+            [12 * person.before_tax_target_bonus_dividends()]
+        ))
+    return summary
+
+
+def get_hiring_summary(datascope, all_n00b_outcomes, month):
+    """Summarize the probability of each outcome `month` months from now for
+    each number of new people
+    """
+    date = list(datascope.iter_future_months(month + 1))[-1]
+    summary = Summary(
+        'OUTCOMES IN %s' % date.strftime('%b %Y'),
+        ['n00bs'] + list(OUTCOMES),
+        ['n00bs'] + ['percent'] * len(OUTCOMES),
+    )
+    for n_n00bs, n00b_outcomes in enumerate(all_n00b_outcomes):
+        summary.add_row(*(
+            [n_n00bs] +
+            [n00b_outcomes[outcome][month] for outcome in OUTCOMES]
+        ))
+    return summary
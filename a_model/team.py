@@ -0,0 +1,170 @@
+"""Columnar representation of the people at Datascope. Rather than looping
+over `Person` objects, everyone's ownership and take-home pay targets are
+stored as arrays, so the profitability of a team is a handful of array
+operations. The arrays can have any number of leading dimensions to evaluate a
+whole batch of candidate teams (different ownership splits, pay targets, etc)
+in one call: every quantity then has the same leading dimensions.
+"""
+
+import numpy
+
+
+class Team(object):
+    """The `ownership` and monthly `after_tax_target_salary` of everyone on
+    the team, as (..., n_people) arrays, along with the compiled config.ini
+    `parameters` that are shared by every team in the batch.
+    """
+
+    def __init__(self, parameters, ownership, after_tax_target_salary,
+                 names=None):
+        self.parameters = parameters
+        self.ownership, self.after_tax_target_salary = numpy.broadcast_arrays(
+            numpy.asarray(ownership, float),
+            numpy.asarray(after_tax_target_salary, float),
+        )
+        self.names = names
+
+    @classmethod
+    def from_datascope(cls, datascope):
+        """Get the team that is currently described in config.ini"""
+        return cls(
+            datascope.parameters,
+            [person.ownership for person in datascope],
+            [person.after_tax_target_salary for person in datascope],
+            names=[person.name for person in datascope],
+        )
+
+    def batch(self, ownership=None, after_tax_target_salary=None):
+        """Create a batch of candidate teams with the same people as this one.
+        Any of the (..., n_people) arrays that are not specified are the same
+        as this team's.
+        """
+        if ownership is None:
+            ownership = self.ownership
+        if after_tax_target_salary is None:
+            after_tax_target_salary = self.after_tax_target_salary
+        return Team(
+            self.parameters, ownership, after_tax_target_salary,
+            names=self.names,
+        )
+
+    def with_new_hires(self, n_hires):
+        """Get this team with `n_hires` new people who have no ownership and
+        the default take-home pay (see `Person.after_tax_target_salary`)
+        """
+        default_pay = self.parameters.after_tax_salary * \
+            (1 + self.parameters.n_months_after_tax_bonus/12)
+        shape = self.ownership.shape[:-1] + (n_hires,)
+        names = self.names
+        if names is not None:
+            names = names + ['n00b_%d' % (i+1) for i in range(n_hires)]
+        return Team(
+            self.parameters,
+            numpy.concatenate([self.ownership, numpy.zeros(shape)], axis=-1),
+            numpy.concatenate([
+                self.after_tax_target_salary, default_pay * numpy.ones(shape),
+            ], axis=-1),
+            names=names,
+        )
+
+    @property
+    def is_active(self):
+        return self.after_tax_target_salary > 0
+
+    @property
+    def is_partner(self):
+        return self.ownership > 0
+
+    @property
+    def n_people(self):
+        return self.is_active.sum(axis=-1)
+
+    @property
+    def n_partners(self):
+        return self.is_partner.sum(axis=-1)
+
+    def fraction_dividends(self):
+        """Fraction of profits that each person gets as a dividend"""
+        return self.parameters.fraction_profit_for_dividends * self.ownership
+
+    def fraction_bonus(self):
+        """Fraction of profits that each person gets as a bonus"""
+        fraction = 1.0 - self.parameters.fraction_profit_for_dividends
+        n_people = self.n_people[..., numpy.newaxis]
+        return fraction / n_people * numpy.ones_like(self.ownership)
+
+    def net_fraction_of_profits(self):
+        """Net fraction of all profits for each person"""
+        return self.fraction_dividends() + self.fraction_bonus()
+
+    def after_tax_target_salary_from_bonus_dividends(self):
+        return self.after_tax_target_salary - self.parameters.after_tax_salary
+
+    def after_tax_target_profit(self):
+        """Based on everyone's personal take-home pay goals, determine the
+        target profit for each team after taxes (see
+        `Datascope.after_tax_target_profit`)
+        """
+        personal_after_tax_target_profits = \
+            self.after_tax_target_salary_from_bonus_dividends() / \
+            self.net_fraction_of_profits()
+        return numpy.median(personal_after_tax_target_profits, axis=-1)
+
+    def before_tax_profit(self):
+        tax_rate = self.parameters.tax_rate
+        profit = self.after_tax_target_profit() / (1 - tax_rate)
+        guaranteed_payment = self.parameters.after_tax_salary / (1 - tax_rate)
+        guaranteed_payment_tax = guaranteed_payment * tax_rate
+        return profit + self.n_partners * guaranteed_payment_tax
+
+    def costs(self):
+        """Estimate rough monthly costs for each team"""
+        return self.parameters.fixed_monthly_costs + \
+            self.parameters.per_datascoper_costs * self.n_people
+
+    def revenue(self):
+        """Monthly revenue target to accomplish target after-tax take-home pay
+        """
+        return self.costs() + self.before_tax_profit()
+
+    def ebit(self):
+        """earnings before interest and taxes (a.k.a. before tax profit
+        rate)"""
+        revenue = self.revenue()
+        return (revenue - self.costs()) / revenue
+
+    def revenue_per_person(self):
+        """Annual revenue per person to meet revenue targets"""
+        return self.revenue() * 12 / self.n_people
+
+    def minimum_hourly_rate(self):
+        """This is the minimum hourly rate necessary to meet our revenue
+        targets for the year, without growing.
+        """
+        yearly_revenue = self.revenue() * 12
+        yearly_billable_hours = \
+            self.parameters.billable_hours_per_year * self.n_people
+        return yearly_revenue / yearly_billable_hours
+
+    def after_tax_salary_from_bonus(self):
+        target_profit = self.after_tax_target_profit()[..., numpy.newaxis]
+        return self.fraction_bonus() * target_profit
+
+    def after_tax_salary_from_dividends(self):
+        target_profit = self.after_tax_target_profit()[..., numpy.newaxis]
+        return self.fraction_dividends() * target_profit
+
+    def after_tax_salary(self):
+        """Monthly take-home pay for each person if we meet our targets"""
+        return (
+            self.after_tax_salary_from_bonus() +
+            self.after_tax_salary_from_dividends() +
+            self.parameters.after_tax_salary
+        )
+
+    def before_tax_target_bonus_dividends(self):
+        # only bonuses are taxed at tax rate.
+        target_bonus = \
+            self.after_tax_salary_from_bonus() / (1 - self.parameters.tax_rate)
+        target_dividends = self.after_tax_salary_from_dividends()
+        return target_bonus + target_dividends
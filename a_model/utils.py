@@ -3,6 +3,9 @@ import sys
 import datetime
 import calendar
 import os
+import hashlib
+
+from . import months
 
 locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
 QBO_DATE_FORMAT = '%m/%d/%Y'
@@ -13,6 +16,14 @@ DATA_ROOT = os.path.join(PROJECT_ROOT, '.data')
 
 MAX_CACHE_AGE = 60 * 60 * 24 * 14
 
+# budgets in bytes for the results that are cached in memory and on disk
+MAX_CACHE_MEMORY = 512 * 1024**2
+MAX_CACHE_DISK = 4 * 1024**3
+
+# remember the hashes of files that have already been read, keyed by their
+# path, size and modification time
+_file_fingerprints = {}
+
 
 def currency_str(x, *args, **kwargs):
     """prettify a float as a currency string"""
@@ -59,10 +70,27 @@ def iter_end_of_months(start_date, end_date):
 
 
 def date_in_n_months(n_months):
-    date = end_of_month(datetime.datetime.today())
-    date += datetime.timedelta(days=30*n_months)
-    return end_of_month(date)
+    """the end of the month `n_months` after this one"""
+    return months.from_ordinal(months.last_month() + 1 + n_months)
 
 
 def urlencode(params):
     return '&'.join('%s=%s' % (a, b) for a, b in params)
+
+
+def file_fingerprint(filename):
+    """hash of the contents of `filename`, which is only reread when the file
+    changes. Files that don't exist have a fingerprint of their own.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return 'missing:' + filename
+    key = (filename, stat.st_size, stat.st_mtime)
+    if key not in _file_fingerprints:
+        m = hashlib.sha1()
+        with open(filename, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(1 << 20), ''):
+                m.update(chunk)
+        _file_fingerprints[key] = m.hexdigest()
+    return _file_fingerprints[key]
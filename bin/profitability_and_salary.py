@@ -19,27 +19,30 @@ from a_model.utils import currency_str
 parser = argparse.ArgumentParser(description=__doc__)
 args = parser.parse_args()
 
-# instantiate datascope
+# instantiate datascope and get everyone as a team
 datascope = Datascope()
+team = datascope.get_team()
 
 # calculate the financials from the information provided in config.ini
 print "If we met the happiness goals we have, we would have the "
 print "following outcomes..."
 print ""
-print "%40s%16s" % ("EBIT", '{:.2%}'.format(datascope.ebit()))
+print "%40s%16s" % ("EBIT", '{:.2%}'.format(team.ebit()))
 print "%40s%15s" % (
     "REVENUE PER PERSON",
-    currency_str(datascope.revenue_per_person()),
+    currency_str(team.revenue_per_person()),
 )
 print "%40s%15s" % (
     "MINIMUM HOURLY RATE",
-    currency_str(datascope.minimum_hourly_rate()),
+    currency_str(team.minimum_hourly_rate()),
 )
 print ""
 print "PERSONAL MONTHLY TAKE HOME PAY:"
-for person in datascope:
+after_tax_salaries = team.after_tax_salary()
+for name, target, salary in zip(team.names, team.after_tax_target_salary,
+                                after_tax_salaries):
     print "%10s%15s%15s" % (
-        person.name,
-        currency_str(person.after_tax_target_salary),
-        currency_str(person.after_tax_salary()),
+        name,
+        currency_str(target),
+        currency_str(salary),
     )
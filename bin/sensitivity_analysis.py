@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Explore how sensitive our outcomes are to the parameters in config.ini that
+affect cash, like fixed monthly costs or the line of credit. Every combination
+of the parameter values is evaluated against the same simulated revenues, so
+even large grids finish quickly. For example:
+
+    sensitivity_analysis.py --vary fixed_monthly_costs 15000 30000 16 \\
+        --vary line_of_credit 50000 150000 5
+"""
+
+from a_model.datascope import Datascope
+from a_model.argparsers import SensitivityParser
+from a_model.simulation import OUTCOMES
+from a_model.utils import currency_str
+from a_model import cache
+
+# parse command line arguments
+parser = SensitivityParser(description=__doc__)
+args = parser.parse_args()
+
+# instantiate datascope and load the reports for the simulations in parallel
+datascope = Datascope(prefetch=True)
+
+# evaluate the outcomes across the whole grid of parameters
+try:
+    grid, outcomes, median_cash = datascope.get_parameter_sensitivity(
+        args.ranges,
+        month=args.month,
+        n_universes=args.n_universes,
+        seed=args.seed,
+        n_workers=args.n_workers,
+        verbose=args.verbose,
+    )
+except ValueError as error:
+    parser.error(str(error))
+
+# print a table of the outcomes at every point in the grid
+columns = [name for name in grid] + list(OUTCOMES) + ['median cash']
+print ''.join("%22s" % column for column in columns)
+for point, point_outcomes in enumerate(outcomes):
+    row = ["%22.2f" % grid[name][point] for name in grid]
+    row += ["%22s" % '{:.1%}'.format(p) for p in point_outcomes]
+    row.append("%22s" % currency_str(median_cash[point]))
+    print ''.join(row)
+
+# report on how well the cache did
+if args.cache_stats:
+    cache.default_cache.print_stats()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Find how far we can push things while keeping our risks in check. For
+example, how many people can we hire and keep the probability of 'bye bye'
+under 5% every month through the end of the year?
+
+    solve_risk_constraints.py hires --max-probability "bye bye" 0.05
+    solve_risk_constraints.py take-home-pay --min-probability goal 0.5
+    solve_risk_constraints.py hourly-rate --n-n00bs 2
+"""
+
+from a_model.datascope import Datascope
+from a_model.argparsers import SolverParser
+from a_model.utils import currency_str
+from a_model import cache
+
+# parse command line arguments
+parser = SolverParser(description=__doc__)
+args = parser.parse_args()
+
+# instantiate datascope and simulate revenues once for the whole search
+datascope = Datascope(prefetch=True)
+solver = datascope.get_solver(
+    month=args.month,
+    n_universes=args.n_universes,
+    seed=args.seed,
+    n_workers=args.n_workers,
+    verbose=args.verbose,
+)
+constraints = {
+    'max_probabilities': args.max_probabilities,
+    'min_probabilities': args.min_probabilities,
+}
+
+# search for the extreme value that meets the constraints
+if args.solve == 'hires':
+    n_hires = solver.max_hires(start_month=args.start_month, **constraints)
+    if n_hires is None:
+        print "Our current team does not meet the constraints"
+    else:
+        print "We can hire %d new people" % n_hires
+elif args.solve == 'take-home-pay':
+    result = solver.max_take_home_pay(**constraints)
+    if result is None:
+        print "No take-home pay targets meet the constraints"
+    else:
+        scale, take_home_pay = result
+        print "We can target {:.0%} of our current take-home pay".format(scale)
+        print ""
+        print "PERSONAL MONTHLY TAKE HOME PAY:"
+        for name, pay in zip(solver.team.names, take_home_pay):
+            print "%10s%15s" % (name, currency_str(pay))
+else:
+    rate = solver.min_hourly_rate(
+        args.n_n00bs, start_month=args.start_month, **constraints
+    )
+    if rate is None:
+        print "No hourly rate meets the constraints"
+    else:
+        print "%40s%15s" % ("MINIMUM HOURLY RATE", currency_str(rate))
+
+# report on how well the cache did
+if args.cache_stats:
+    cache.default_cache.print_stats()
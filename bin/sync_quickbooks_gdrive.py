@@ -5,14 +5,30 @@ results locally and also synchronoze relevant reports to our google
 spreadsheet.
 """
 
+import argparse
+
 from a_model import reports
 from a_model.datascope import Datascope
 
+# parse command line arguments
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument(
+    '--full-upload',
+    action='store_true',
+    help=(
+        'upload every cell of every report to google drive rather than only '
+        'the cells that changed'
+    ),
+)
+args = parser.parse_args()
+
 # get some credentials from the datascope object
 datascope = Datascope()
 username = datascope.config.get('quickbooks', 'username')
 password = datascope.config.get('quickbooks', 'password')
 
-# download and sync the reports
-reports.cache_quickbooks_locally(username, password)
-reports.sync_local_cache_with_gdrive()
+# download the reports and sync the ones that changed
+changed_reports = reports.cache_quickbooks_locally(username, password)
+if args.full_upload:
+    changed_reports = reports.GDRIVE_REPORTS
+reports.sync_local_cache_with_gdrive(changed_reports, full=args.full_upload)
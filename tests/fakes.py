@@ -0,0 +1,293 @@
+"""Local stand-ins for the services that reports are synced with: a fake of
+the gspread worksheets in the google spreadsheet, and a quickbooks server
+with a login form and reports to export.
+"""
+
+import io
+import os
+import Cookie
+import urllib
+import urllib2
+import urlparse
+import threading
+import cookielib
+import BaseHTTPServer
+import SocketServer
+
+import openpyxl
+from gspread.exceptions import RequestError
+
+from a_model.reports.formulas import (
+    CELL_REGEX, FormulaResolver, parse_coordinate,
+)
+from a_model.reports.fetchers import Fetcher
+from a_model.reports.downloads import DownloadWatcher, PARTIAL_EXTENSION
+
+
+def make_xlsx(rows):
+    """Make the contents of an xlsx file with `rows` of values"""
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    return stream.getvalue()
+
+
+def to_r1c1(formula, row, column):
+    """Convert the A1 cell references in `formula` to the relative R1C1
+    references that google gives formulas back with
+    """
+    def replace(match):
+        other_row, other_column = parse_coordinate(match.group(0))
+        return 'R[%d]C[%d]' % (other_row - row, other_column - column)
+    return CELL_REGEX.sub(replace, formula)
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class FakeCell(object):
+    """A cell like gspread's, with its `input_value`, `value` and
+    `numeric_value`
+    """
+
+    def __init__(self, worksheet, row, col):
+        self.row = row
+        self.col = col
+        self.input_value = worksheet.cells.get((row, col), u'')
+        self.value = self.input_value
+        self.numeric_value = None
+        if self.input_value.startswith('='):
+            self.numeric_value = worksheet.resolve(row, col)
+            self.value = unicode(self.numeric_value)
+            self.input_value = to_r1c1(self.input_value, row, col)
+        elif isinstance(to_number(self.input_value), float):
+            self.numeric_value = float(self.input_value)
+
+
+class FakeWorksheet(object):
+    """A google worksheet that keeps its cells in memory and records every
+    request. Requests fail with the http statuses in `failures`, one at a
+    time, before they go through.
+    """
+
+    def __init__(self, row_count=1000, col_count=26, cells=None):
+        self.row_count = row_count
+        self.col_count = col_count
+        self.cells = dict(cells or {})
+        self.requests = []
+        self.failures = []
+
+    def request(self, name, n_cells=0):
+        if self.failures:
+            raise RequestError(self.failures.pop(0), 'fake failure')
+        self.requests.append((name, n_cells))
+
+    def resolve(self, row, col):
+        values = dict(
+            (position, to_number(value))
+            for position, value in self.cells.iteritems()
+        )
+        return FormulaResolver(values).resolve(row, col)
+
+    def findall(self, query):
+        self.request('findall')
+        cells = [FakeCell(self, row, col) for row, col in sorted(self.cells)]
+        return [cell for cell in cells if query.search(cell.value)]
+
+    def range(self, first_row, first_col, last_row, last_col):
+        if last_row > self.row_count or last_col > self.col_count:
+            raise RequestError(400, 'range is outside of the worksheet')
+        self.request(
+            'range',
+            (last_row - first_row + 1) * (last_col - first_col + 1),
+        )
+        return [
+            FakeCell(self, row, col)
+            for row in range(first_row, last_row + 1)
+            for col in range(first_col, last_col + 1)
+        ]
+
+    def update_cells(self, cells):
+        self.request('update_cells', len(cells))
+        for cell in cells:
+            value = unicode(cell.value)
+            if value.startswith('='):
+                self.cells[(cell.row, cell.col)] = value
+            elif value:
+                number = to_number(value)
+                if isinstance(number, float) and number.is_integer():
+                    value = unicode(int(number))
+                self.cells[(cell.row, cell.col)] = value
+            else:
+                self.cells.pop((cell.row, cell.col), None)
+
+    def resize(self, rows=None, cols=None):
+        self.request('resize')
+        self.row_count = rows or self.row_count
+        self.col_count = cols or self.col_count
+
+
+class FakeWorkbook(object):
+
+    def __init__(self, **worksheets):
+        self.worksheets = worksheets
+
+    def worksheet(self, title):
+        return self.worksheets.setdefault(title, FakeWorksheet())
+
+
+LOGIN_FORM = '''<html><body>
+<form action="/login" method="post">
+  <input type="hidden" name="csrf" value="%s">
+  <input name="login">
+  <input name="password" type="password">
+</form>
+</body></html>'''
+
+
+class QuickbooksHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body, headers=()):
+        self.send_response(200)
+        for header in headers:
+            self.send_header(*header)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_logged_in(self):
+        cookie = Cookie.SimpleCookie(self.headers.get('Cookie', ''))
+        return 'session' in cookie and \
+            cookie['session'].value == self.server.session
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        length = int(self.headers['Content-Length'])
+        fields = urlparse.parse_qs(self.rfile.read(length))
+        credentials = (
+            fields.get('login', [None])[0],
+            fields.get('password', [None])[0],
+            fields.get('csrf', [None])[0],
+        )
+        if credentials == self.server.credentials + (self.server.csrf,):
+            cookie = 'session=%s; Path=/' % self.server.session
+            self.reply('<html>welcome</html>', [('Set-Cookie', cookie)])
+        else:
+            self.reply(LOGIN_FORM % self.server.csrf)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        url = urlparse.urlparse(self.path)
+        query = urlparse.parse_qs(url.query)
+        report_id = query.get('rptId', [None])[0]
+        if url.path != '/app/report' or not self.is_logged_in():
+            return self.reply(LOGIN_FORM % self.server.csrf)
+
+        # exports can be refused like quickbooks sometimes does, which only
+        # leaves the browser
+        exported = query.get('format') == ['xlsx']
+        if exported and not self.server.accept_exports:
+            return self.reply('<html>open this report in a browser</html>')
+        self.server.requests.append((report_id, exported))
+        self.reply(self.server.reports[report_id])
+
+
+class QuickbooksServer(SocketServer.ThreadingMixIn,
+                       BaseHTTPServer.HTTPServer):
+    """A local quickbooks with a login form, that exports `reports` (a dict
+    of xlsx files by report id) once the session is logged in as `username`
+    with `password`
+    """
+    daemon_threads = True
+
+    def __init__(self, reports, username='user', password='secret'):
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), QuickbooksHandler,
+        )
+        self.reports = reports
+        self.credentials = (username, password)
+        self.csrf = 'f4c3'
+        self.session = '53ss10n'
+        self.accept_exports = True
+        self.connections = set()
+        self.requests = []
+
+    @property
+    def root_url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def __enter__(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeReport(object):
+    """The parts of a `Report` that fetchers use. Downloading the report
+    just remembers the file that was fetched.
+    """
+    report_id = None
+    report_name = None
+    fetched = {}
+
+    def get_url(self, root_url):
+        return root_url + '/app/report?' + urllib.urlencode({
+            'rptId': self.report_id,
+        })
+
+    def download_from_quickbooks(self, fetcher):
+        filename = fetcher.fetch(self)
+        with open(filename, 'rb') as stream:
+            type(self).fetched[self.report_name] = stream.read()
+        return True
+
+
+class StandInBrowser(Fetcher):
+    """Fetch reports like `Browser` does, with a session of its own for
+    every report and downloads that show up in the download directory as a
+    partial file first
+    """
+
+    # how long to wait for a download, in seconds
+    download_timeout = 2
+
+    def login(self, username, password):
+        self.opener = urllib2.build_opener(
+            urllib2.HTTPCookieProcessor(cookielib.CookieJar()),
+        )
+        self.opener.open(self.root_url + '/login', urllib.urlencode({
+            'login': username, 'password': password, 'csrf': 'f4c3',
+        })).read()
+
+    def download(self, url, filename):
+        data = self.opener.open(url).read()
+        with open(filename + PARTIAL_EXTENSION, 'wb') as stream:
+            stream.write(data)
+        os.rename(filename + PARTIAL_EXTENSION, filename)
+
+    def fetch(self, report):
+        filename = os.path.join(self.download_dir, 'report1.xlsx')
+        with DownloadWatcher(self.download_dir) as watcher:
+            thread = threading.Thread(
+                target=self.download,
+                args=(report.get_url(self.root_url), filename),
+            )
+            thread.start()
+            filename = watcher.wait(timeout=self.download_timeout)
+        thread.join()
+        return filename
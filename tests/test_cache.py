@@ -0,0 +1,67 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from a_model import cache
+
+
+class CleanupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = cache.Cache(
+            root=self.root, memory_budget=0, disk_budget=10, max_age=60,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, *path):
+        filename = os.path.join(self.root, *path)
+        cache.makedirs(os.path.dirname(filename))
+        with open(filename, 'wb') as stream:
+            stream.write('x' * 100)
+        return filename
+
+    def expire(self, filename):
+        old = time.time() - 120
+        os.utime(filename, (old, old))
+
+    def test_only_owned_directories(self):
+        owned = self.write('result.pkl')
+        snapshot = self.write('snapshots', 'report.npz')
+        report = self.write('report.xlsx')
+        batch = self.write('revenues', 'batch.npy')
+        for filename in (owned, snapshot, report, batch):
+            self.expire(filename)
+        self.cache.cleanup()
+        self.assertFalse(os.path.exists(owned))
+        for filename in (snapshot, report, batch):
+            self.assertTrue(os.path.exists(filename))
+
+        self.cache.add_directory(os.path.join(self.root, 'revenues'))
+        self.cache.cleanup()
+        self.assertFalse(os.path.exists(batch))
+        self.assertTrue(os.path.exists(snapshot))
+
+    def test_disk_budget_spares_other_files(self):
+        snapshot = self.write('snapshots', 'report.npz')
+        self.cache.put('result', range(100))
+        self.assertEqual(self.cache.stats['disk evictions'], 1)
+        self.assertFalse(os.path.exists(self.cache.get_filename('result')))
+        self.assertTrue(os.path.exists(snapshot))
+
+    def test_locks_in_use_are_kept(self):
+        with self.cache.lock('result'):
+            filename = os.path.join(self.cache.lock_root, 'result.lock')
+            self.expire(filename)
+            self.cache.cleanup()
+            self.assertTrue(os.path.exists(filename))
+        self.cache.cleanup()
+        self.assertFalse(os.path.exists(filename))
+
+        # a lock that was cleaned up is simply made again
+        with self.cache.lock('result'):
+            self.assertTrue(os.path.exists(filename))
@@ -0,0 +1,96 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from a_model.reports.downloads import (
+    DownloadWatcher, DownloadTimeout, is_complete, PARTIAL_EXTENSION,
+)
+
+from .fakes import make_xlsx
+
+
+class DownloadWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'report.xlsx')
+        self.data = make_xlsx([['Income', 1200]])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, data):
+        with open(filename, 'wb') as stream:
+            stream.write(data)
+
+    def download(self, delay=0.1):
+        """Download the report like firefox does, into a partial file that
+        is written a bit at a time and then renamed
+        """
+        time.sleep(delay)
+        partial = self.filename + PARTIAL_EXTENSION
+        self.write(self.filename, '')
+        self.write(partial, self.data[:100])
+        time.sleep(delay)
+        self.write(partial, self.data)
+        os.rename(partial, self.filename)
+
+    def test_partial_download(self):
+        with DownloadWatcher(self.directory) as watcher:
+            thread = threading.Thread(target=self.download)
+            thread.start()
+            filename = watcher.wait(timeout=10)
+        thread.join()
+        self.assertEqual(filename, self.filename)
+        with open(filename, 'rb') as stream:
+            self.assertEqual(stream.read(), self.data)
+
+    def test_finished_before_wait(self):
+        with DownloadWatcher(self.directory) as watcher:
+            self.write(self.filename, self.data)
+            self.assertEqual(watcher.wait(timeout=10), self.filename)
+
+    def test_other_files(self):
+        with DownloadWatcher(self.directory) as watcher:
+            self.write(os.path.join(self.directory, 'report.csv'), self.data)
+            with self.assertRaises(DownloadTimeout):
+                watcher.wait(timeout=0.5)
+
+    def test_timeout(self):
+        with DownloadWatcher(self.directory) as watcher:
+            self.write(self.filename + PARTIAL_EXTENSION, self.data[:100])
+            with self.assertRaises(DownloadTimeout):
+                watcher.wait(timeout=0.5)
+
+
+class IsCompleteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'report.xlsx')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, data):
+        with open(filename, 'wb') as stream:
+            stream.write(data)
+
+    def test_xlsx(self):
+        self.write(self.filename, make_xlsx([['Assets', 5000]]))
+        self.assertTrue(is_complete(self.filename))
+
+    def test_web_page(self):
+        self.write(self.filename, '<html>open this report</html>')
+        self.assertFalse(is_complete(self.filename))
+
+    def test_partial_sibling(self):
+        self.write(self.filename, make_xlsx([['Assets', 5000]]))
+        self.write(self.filename + PARTIAL_EXTENSION, '')
+        self.assertFalse(is_complete(self.filename))
+
+    def test_missing(self):
+        self.assertFalse(is_complete(self.filename))
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy
+
+from a_model import simulation
+from a_model import exact
+
+# a few invoices, some of them overdue, and a few projections
+PAYMENTS = (
+    [-1, 0, 1], [30000.0, 20000.0, 15000.0], [1, 2], [25000.0, 40000.0],
+)
+N_MONTHS = 6
+CASH_IN_BANK = 10000.0
+COSTS = 20000.0
+LINE_OF_CREDIT = 30000.0
+THRESHOLDS = numpy.array([
+    [-LINE_OF_CREDIT, 0.0, 2 * COSTS, 4 * COSTS] for month in range(N_MONTHS)
+])
+
+
+class CashDistributionTest(unittest.TestCase):
+
+    def get_distribution(self, line_of_credit=LINE_OF_CREDIT, costs=COSTS):
+        return exact.CashDistribution(
+            PAYMENTS, N_MONTHS, CASH_IN_BANK, costs, line_of_credit,
+        )
+
+    def simulate(self, n_universes, line_of_credit=LINE_OF_CREDIT):
+        revenues = simulation.simulate_revenues_in_blocks(
+            PAYMENTS, N_MONTHS, n_universes, master_seed=7,
+        )
+        return simulation.simulate_monthly_cash(
+            revenues, CASH_IN_BANK, COSTS, line_of_credit,
+        )
+
+    def test_probabilities_add_up(self):
+        distribution = self.get_distribution()
+        totals = distribution.probabilities.sum(axis=1) + \
+            distribution.bankrupt
+        numpy.testing.assert_allclose(totals, 1.0)
+        self.assertTrue((numpy.diff(distribution.bankrupt) >= 0).all())
+
+    def test_expected_cash(self):
+
+        # nobody ever goes bust without a limit on the line of credit, so the
+        # expected cash is just the expected revenue so far
+        distribution = self.get_distribution(line_of_credit=numpy.inf)
+        expected = (distribution.values * distribution.probabilities).sum(1)
+        arrived = numpy.cumsum(numpy.vstack([
+            exact.get_arrival_pmfs([0, 0, 1], exact.ONTIME_PMF, N_MONTHS),
+            exact.get_arrival_pmfs([1, 2], exact.PROJECTION_PMF, N_MONTHS),
+        ]), axis=1)
+        balances = numpy.concatenate([PAYMENTS[1], PAYMENTS[3]])
+        spent = COSTS * numpy.arange(1, N_MONTHS + 1)
+        numpy.testing.assert_allclose(
+            expected, CASH_IN_BANK - spent + balances.dot(arrived),
+        )
+
+    def test_matches_monte_carlo(self):
+        distribution = self.get_distribution()
+        probabilities = distribution.get_outcome_probabilities(THRESHOLDS)
+        monthly_cash = self.simulate(200000)
+        sampled = simulation.get_outcome_probabilities(
+            simulation.classify_outcomes(monthly_cash, THRESHOLDS),
+        )
+
+        # this case goes bust about half the time by the end
+        self.assertGreater(sampled[-1, -1], 0.4)
+        numpy.testing.assert_allclose(probabilities, sampled, atol=0.01)
+
+        # and the cash is on the same grid of round thousands in both
+        cash = numpy.where(numpy.isnan(monthly_cash), -numpy.inf, monthly_cash)
+        numpy.testing.assert_array_equal(
+            distribution.get_quantiles([0.25, 0.5]),
+            numpy.percentile(cash, [25, 50], axis=0, interpolation='lower'),
+        )
+
+    def test_bankruptcy_is_checked_before_revenue(self):
+
+        # the first month's bills put us beyond the line of credit before
+        # anything arrives, so nothing can save us
+        distribution = self.get_distribution(
+            costs=CASH_IN_BANK + LINE_OF_CREDIT + 1,
+        )
+        numpy.testing.assert_array_equal(distribution.bankrupt, 1.0)
+        probabilities = distribution.get_outcome_probabilities(THRESHOLDS)
+        numpy.testing.assert_array_equal(probabilities[:, -1], 1.0)
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from a_model import utils
+from a_model import reports
+from a_model.reports.fetchers import FetchError, HTTPFetcher
+
+from .fakes import make_xlsx, QuickbooksServer, FakeReport, StandInBrowser
+
+
+class ProfitLoss(FakeReport):
+    report_id = 'pl'
+    report_name = 'ProfitLoss.xlsx'
+
+
+class BalanceSheet(FakeReport):
+    report_id = 'bs'
+    report_name = 'BalanceSheet.xlsx'
+
+
+class QuickbooksTestCase(unittest.TestCase):
+    """Fetch the fixture reports from a local quickbooks"""
+
+    def setUp(self):
+        self.data_root = utils.DATA_ROOT
+        utils.DATA_ROOT = tempfile.mkdtemp()
+        FakeReport.fetched.clear()
+        self.reports = {
+            'pl': make_xlsx([['Income', 1200], ['Expenses', 1000]]),
+            'bs': make_xlsx([['Assets', 5000]]),
+        }
+        self.server = QuickbooksServer(self.reports).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(utils.DATA_ROOT)
+        utils.DATA_ROOT = self.data_root
+
+
+class DownloadPipelineTest(QuickbooksTestCase):
+
+    def test_download_in_parallel(self):
+        changed = reports.download_from_quickbooks(
+            [ProfitLoss, BalanceSheet], StandInBrowser, 'user', 'secret',
+            self.server.root_url,
+        )
+        self.assertEqual(changed, [True, True])
+
+        # every report downloads to report1.xlsx in a directory of its own
+        self.assertEqual(FakeReport.fetched, {
+            'ProfitLoss.xlsx': self.reports['pl'],
+            'BalanceSheet.xlsx': self.reports['bs'],
+        })
+        self.assertEqual(
+            sorted(self.server.requests), [('bs', False), ('pl', False)],
+        )
+        downloads = os.path.join(utils.DATA_ROOT, 'downloads')
+        self.assertEqual(os.listdir(downloads), [])
+
+    def test_bad_login(self):
+
+        # a browser that isn't logged in only gets a web page, rather than an
+        # xlsx file, so the download never finishes
+        changed = reports.download_from_quickbooks(
+            [ProfitLoss, BalanceSheet], StandInBrowser, 'user', 'wrong',
+            self.server.root_url,
+        )
+        for error in changed:
+            self.assertIsInstance(error, FetchError)
+        self.assertEqual(FakeReport.fetched, {})
+
+
+class HTTPFetcherTest(QuickbooksTestCase):
+
+    def test_login(self):
+        with HTTPFetcher(root_url=self.server.root_url) as fetcher:
+            fetcher.login('user', 'secret')
+            self.assertEqual(
+                fetcher.session.cookies.get('session'), self.server.session,
+            )
+
+    def test_bad_login(self):
+        with HTTPFetcher(root_url=self.server.root_url) as fetcher:
+            with self.assertRaises(FetchError):
+                fetcher.login('user', 'wrong')
+
+    def test_fetch(self):
+        with HTTPFetcher(root_url=self.server.root_url) as fetcher:
+            fetcher.login('user', 'secret')
+            filename = fetcher.fetch(ProfitLoss())
+            with open(filename, 'rb') as stream:
+                self.assertEqual(stream.read(), self.reports['pl'])
+            download_dir = fetcher.download_dir
+        self.assertEqual(self.server.requests, [('pl', True)])
+        self.assertFalse(os.path.exists(download_dir))
+
+    def test_fetch_without_login(self):
+        with HTTPFetcher(root_url=self.server.root_url) as fetcher:
+            with self.assertRaises(FetchError):
+                fetcher.fetch(ProfitLoss())
+            self.assertEqual(os.listdir(fetcher.download_dir), [])
+
+    def test_fetch_refused_export(self):
+        self.server.accept_exports = False
+        with HTTPFetcher(root_url=self.server.root_url) as fetcher:
+            fetcher.login('user', 'secret')
+            with self.assertRaises(FetchError):
+                fetcher.fetch(ProfitLoss())
+            self.assertEqual(os.listdir(fetcher.download_dir), [])
+
+    def test_shared_session(self):
+        changed = reports.download_from_quickbooks(
+            [ProfitLoss, BalanceSheet], HTTPFetcher, 'user', 'secret',
+            self.server.root_url,
+        )
+        self.assertEqual(changed, [True, True])
+        self.assertEqual(FakeReport.fetched, {
+            'ProfitLoss.xlsx': self.reports['pl'],
+            'BalanceSheet.xlsx': self.reports['bs'],
+        })
+        self.assertEqual(
+            sorted(self.server.requests), [('bs', True), ('pl', True)],
+        )
+
+
+class FallbackTest(QuickbooksTestCase):
+
+    def test_fallback(self):
+        self.server.accept_exports = False
+        changed = reports.download_with_fallback(
+            [ProfitLoss, BalanceSheet], (HTTPFetcher, StandInBrowser),
+            'user', 'secret', self.server.root_url,
+        )
+        self.assertEqual(changed, [True, True])
+        self.assertEqual(FakeReport.fetched, {
+            'ProfitLoss.xlsx': self.reports['pl'],
+            'BalanceSheet.xlsx': self.reports['bs'],
+        })
+        self.assertEqual(
+            sorted(self.server.requests), [('bs', False), ('pl', False)],
+        )
+
+    def test_no_fallback_left(self):
+        self.server.accept_exports = False
+        with self.assertRaises(FetchError):
+            reports.download_with_fallback(
+                [ProfitLoss], (HTTPFetcher,), 'user', 'secret',
+                self.server.root_url,
+            )
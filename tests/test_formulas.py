@@ -0,0 +1,111 @@
+import io
+import unittest
+
+import openpyxl
+
+from a_model.reports.formulas import (
+    FormulaError, FormulaResolver, Parser, parse_coordinate,
+)
+
+from .fakes import make_xlsx
+
+
+class CountingResolver(FormulaResolver):
+    """Count how many times each cell is evaluated"""
+
+    def __init__(self, values):
+        super(CountingResolver, self).__init__(values)
+        self.evaluated = {}
+
+    def resolve(self, row, column):
+        if (row, column) not in self._resolved:
+            self.evaluated[(row, column)] = \
+                self.evaluated.get((row, column), 0) + 1
+        return super(CountingResolver, self).resolve(row, column)
+
+
+class FormulaResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        # a little profit and loss, with totals and subtotals referring to
+        # each other like quickbooks exports them
+        self.values = {
+            (7, 2): '=1200.50', (8, 2): '=300', (9, 2): 99.5,
+            (10, 2): '=(B7)+(B8)+(B9)',
+            (12, 2): '=250', (13, 2): '=SUM(B12:B12)',
+            (15, 2): '=(B10)-(B13)',
+            (16, 2): '=SUBTOTAL(9,B7:B9)/2',
+            (17, 2): '=-$B$15*2',
+            (7, 3): '=B7+1', (8, 3): '=SUM(B7:C7, 4)',
+        }
+        self.resolver = CountingResolver(self.values)
+
+    def test_numbers(self):
+        self.assertEqual(self.resolver.resolve(7, 2), 1200.5)
+        self.assertEqual(self.resolver.resolve(9, 2), 99.5)
+
+    def test_empty(self):
+        self.assertEqual(self.resolver.resolve(11, 2), 0.0)
+
+    def test_cross_cell_references(self):
+        self.assertEqual(self.resolver.resolve(10, 2), 1600.0)
+        self.assertEqual(self.resolver.resolve(13, 2), 250.0)
+        self.assertEqual(self.resolver.resolve(15, 2), 1350.0)
+        self.assertEqual(self.resolver.resolve(16, 2), 800.0)
+        self.assertEqual(self.resolver.resolve(17, 2), -2700.0)
+        self.assertEqual(self.resolver.resolve(8, 3), 1200.5 + 1201.5 + 4)
+
+    def test_resolve_row(self):
+        self.assertEqual(
+            self.resolver.resolve_row(7, 1, 3), [0.0, 1200.5, 1201.5],
+        )
+
+    def test_every_cell_evaluated_once(self):
+        for row in (17, 16, 15, 10, 13):
+            self.resolver.resolve(row, 2)
+        self.assertEqual(set(self.resolver.evaluated.values()), set([1]))
+        self.assertEqual(self.resolver.evaluated[(7, 2)], 1)
+
+    def test_circular_reference(self):
+        resolver = FormulaResolver({(1, 1): '=B1+1', (1, 2): '=A1'})
+        with self.assertRaises(FormulaError):
+            resolver.resolve(1, 1)
+
+    def test_unsupported(self):
+        resolver = FormulaResolver({
+            (1, 1): '=AVERAGE(B1:B3)', (2, 1): '=1/0', (3, 1): '=1 +',
+            (4, 1): '=SUBTOTAL(1,B1:B3)', (5, 1): u'Income',
+        })
+        for row in range(1, 6):
+            with self.assertRaises(FormulaError):
+                resolver.resolve(row, 1)
+
+    def test_from_worksheet(self):
+        data = make_xlsx([
+            ['Income', '=1000'], ['Other', '=200'], ['Total', '=(B1)+(B2)'],
+        ])
+        for read_only in (True, False):
+            workbook = openpyxl.load_workbook(
+                io.BytesIO(data), read_only=read_only,
+            )
+            resolver = FormulaResolver.from_worksheet(workbook.active)
+            self.assertEqual(resolver.values[(3, 1)], 'Total')
+            self.assertEqual(resolver.resolve(3, 2), 1200.0)
+
+
+class ParserTest(unittest.TestCase):
+
+    def test_parse_coordinate(self):
+        self.assertEqual(parse_coordinate('B7'), (7, 2))
+        self.assertEqual(parse_coordinate('$AA$10'), (10, 27))
+
+    def test_ranges(self):
+        self.assertEqual(Parser('SUM(C2:B1)').parse(), (
+            'sum', (('cells', ((1, 2), (1, 3), (2, 2), (2, 3))),),
+        ))
+
+    def test_precedence(self):
+        self.assertEqual(Parser('1+2*-3').parse(), (
+            '+', ('number', 1.0),
+            ('*', ('number', 2.0), ('negative', ('number', 3.0))),
+        ))
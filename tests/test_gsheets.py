@@ -0,0 +1,164 @@
+import unittest
+
+import openpyxl
+from gspread.exceptions import RequestError
+
+from a_model.reports import gsheets
+
+from .fakes import FakeWorksheet, FakeWorkbook
+
+
+def local_cells(values):
+    """Make local cells like `gsheets.read_local_cells` from a dict of
+    {(row, column): value}
+    """
+    cells = {}
+    for position, value in values.iteritems():
+        cells[position] = (gsheets.to_input_value(value), value)
+    return cells
+
+
+class SyncWorksheetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backoff = gsheets.BACKOFF
+        gsheets.BACKOFF = 0
+        self.local = local_cells({
+            (1, 1): u'Profit and Loss',
+            (2, 1): u'Income', (2, 2): 1200.0, (2, 3): 1300.5,
+            (3, 1): u'Expenses', (3, 2): 1000.0, (3, 3): 900.0,
+        })
+        self.local[(4, 2)] = (u'=B2-B3', 200.0)
+        self.local[(4, 3)] = (u'=C2-C3', 400.5)
+        self.worksheet = FakeWorksheet()
+        gsheets.sync_worksheet(self.worksheet, self.local)
+        self.worksheet.requests = []
+
+    def tearDown(self):
+        gsheets.BACKOFF = self.backoff
+
+    def get_uploads(self):
+        return sum(
+            n_cells for name, n_cells in self.worksheet.requests
+            if name == 'update_cells'
+        )
+
+    def test_first_sync(self):
+        self.assertEqual(self.worksheet.cells, {
+            (1, 1): u'Profit and Loss',
+            (2, 1): u'Income', (2, 2): u'1200', (2, 3): u'1300.5',
+            (3, 1): u'Expenses', (3, 2): u'1000', (3, 3): u'900',
+            (4, 2): u'=B2-B3', (4, 3): u'=C2-C3',
+        })
+
+    def test_nothing_changed(self):
+        self.assertEqual(gsheets.sync_worksheet(self.worksheet, self.local), 0)
+        self.assertEqual(self.worksheet.requests, [('findall', 0)])
+
+    def test_only_changes_are_uploaded(self):
+        self.local[(3, 3)] = (u'950', 950.0)
+        self.local[(4, 3)] = (u'=C2-C3', 350.5)
+        self.worksheet.cells[(7, 5)] = u'typed in by hand'
+        self.assertEqual(gsheets.sync_worksheet(self.worksheet, self.local), 3)
+        self.assertEqual(self.get_uploads(), 3)
+        self.assertEqual(self.worksheet.cells[(3, 3)], u'950')
+        self.assertEqual(self.worksheet.cells[(4, 3)], u'=C2-C3')
+        self.assertNotIn((7, 5), self.worksheet.cells)
+
+    def test_changed_formula_values_are_uploaded(self):
+        self.worksheet.cells[(4, 2)] = u'=B2'
+        self.assertEqual(gsheets.sync_worksheet(self.worksheet, self.local), 1)
+        self.assertEqual(self.worksheet.cells[(4, 2)], u'=B2-B3')
+
+    def test_full(self):
+        n_cells = gsheets.sync_worksheet(self.worksheet, self.local, full=True)
+        self.assertEqual(n_cells, len(self.local))
+        self.assertEqual(self.get_uploads(), len(self.local))
+
+    def test_resize(self):
+        self.local[(1500, 30)] = (u'way out there', u'way out there')
+        gsheets.sync_worksheet(self.worksheet, self.local)
+        self.assertEqual(
+            (self.worksheet.row_count, self.worksheet.col_count), (1500, 30),
+        )
+        self.assertEqual(self.worksheet.cells[(1500, 30)], u'way out there')
+
+    def test_batches(self):
+        local = local_cells(dict(
+            ((row, column), float(row * column))
+            for row in range(1, 101) for column in range(1, 13)
+        ))
+        worksheet = FakeWorksheet()
+        gsheets.sync_worksheet(worksheet, local, batch_size=50)
+        self.assertEqual(len(worksheet.cells), len(local))
+        for name, n_cells in worksheet.requests:
+            self.assertLessEqual(n_cells, 50)
+
+    def test_retry_on_quota(self):
+        self.local[(3, 3)] = (u'950', 950.0)
+        self.worksheet.failures = [429, 503]
+        self.assertEqual(gsheets.sync_worksheet(self.worksheet, self.local), 1)
+        self.assertEqual(self.worksheet.cells[(3, 3)], u'950')
+
+    def test_no_retry_on_other_errors(self):
+        self.worksheet.failures = [403]
+        with self.assertRaises(RequestError):
+            gsheets.sync_worksheet(self.worksheet, self.local)
+        self.assertEqual(self.worksheet.requests, [])
+
+    def test_give_up_retrying(self):
+        self.worksheet.failures = [429] * gsheets.MAX_ATTEMPTS
+        with self.assertRaises(RequestError):
+            gsheets.sync_worksheet(self.worksheet, self.local)
+
+
+class GetBatchesTest(unittest.TestCase):
+
+    def assertBatches(self, changes, batch_size):
+        batches = gsheets.get_batches(changes, batch_size)
+        positions = []
+        for cell_range, batch_positions in batches:
+            first_row, first_col, last_row, last_col = cell_range
+            n_cells = (last_row - first_row + 1) * (last_col - first_col + 1)
+            self.assertLessEqual(n_cells, batch_size)
+            for row, column in batch_positions:
+                self.assertTrue(first_row <= row <= last_row)
+                self.assertTrue(first_col <= column <= last_col)
+            positions.extend(batch_positions)
+        self.assertEqual(sorted(positions), sorted(changes))
+        return batches
+
+    def test_column(self):
+        changes = dict(((row, 7), u'') for row in range(1, 101))
+        batches = self.assertBatches(changes, 10)
+        self.assertEqual(len(batches), 10)
+
+    def test_wide_row(self):
+        self.assertBatches({(1, 1): u'', (1, 500): u'', (2, 3): u''}, 100)
+
+    def test_scattered(self):
+        changes = dict(
+            ((row, (row * 37) % 91 + 1), u'') for row in range(1, 300)
+        )
+        self.assertBatches(changes, 50)
+
+
+class ReadLocalCellsTest(unittest.TestCase):
+
+    def test_sync_xlsx_worksheet(self):
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.append([u'Total', 1.0, 2.5, None])
+        worksheet.append([None, u'=B1+C1'])
+        local = gsheets.read_local_cells(worksheet)
+        self.assertEqual(local, {
+            (1, 1): (u'Total', u'Total'),
+            (1, 2): (u'1', 1.0),
+            (1, 3): (u'2.5', 2.5),
+            (2, 2): (u'=B1+C1', 3.5),
+        })
+
+        google_workbook = FakeWorkbook()
+        google_worksheet = google_workbook.worksheet('Total')
+        self.assertEqual(gsheets.sync_worksheet(google_worksheet, local), 4)
+        self.assertEqual(gsheets.sync_worksheet(google_worksheet, local), 0)
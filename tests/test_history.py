@@ -0,0 +1,184 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from a_model import utils
+from a_model import months
+from a_model.reports.profit_loss import ProfitLoss
+from a_model.reports.history import MonthlyWorksheet
+
+from .fakes import make_xlsx
+
+TITLES = [['Datascope'], ['Profit and Loss'], ['By month'], [None]]
+
+
+def make_report(month_names, lines):
+    """Make a monthly report like quickbooks exports them, with a total
+    column, from (label, [amount, ...]) `lines`
+    """
+    rows = TITLES + [[None] + list(month_names) + ['Total']]
+    for label, amounts in lines:
+        rows.append([label] + [
+            None if amount is None else '=%s' % amount for amount in amounts
+        ] + ['=%s' % sum(amount or 0 for amount in amounts)])
+    return make_xlsx(rows)
+
+
+def ordinal(name):
+    return months.to_ordinal(ProfitLoss().get_date_from_value(name))
+
+
+class MonthlyWorksheetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, data):
+        filename = os.path.join(self.directory, 'report.xlsx')
+        with open(filename, 'wb') as stream:
+            stream.write(data)
+        return MonthlyWorksheet.read(ProfitLoss(), filename, has_total=True)
+
+    def get_amounts(self, worksheet):
+        return dict(
+            (label, dict(
+                (months.from_ordinal(month).strftime('%b %Y'), value)
+                for month, value in amounts.iteritems()
+            ))
+            for key, label, amounts in worksheet.lines
+        )
+
+    def test_read(self):
+        worksheet = self.read(make_report(
+            ['Jan 2026', 'Feb 2026'],
+            [('Income', [100, 200]), ('Expenses', [None, 50])],
+        ))
+        self.assertEqual(worksheet.titles[:3], [
+            'Datascope', 'Profit and Loss', 'By month',
+        ])
+        self.assertEqual(worksheet.months, [
+            ordinal('Jan 2026'), ordinal('Feb 2026'),
+        ])
+        self.assertEqual(self.get_amounts(worksheet), {
+            'Income': {'Jan 2026': 100.0, 'Feb 2026': 200.0},
+            'Expenses': {'Feb 2026': 50.0},
+        })
+
+    def test_merge_revised_months(self):
+        history = self.read(make_report(
+            ['Jan 2026', 'Feb 2026', 'Mar 2026'],
+            [('Income', [100, 200, 300]), ('Refunds', [5, 6, 7]),
+             ('Expenses', [10, 20, 30])],
+        ))
+
+        # march was revised, april is new, there is a new line and refunds
+        # no longer show up in the recent months
+        recent = self.read(make_report(
+            ['Mar 2026', 'Apr 2026'],
+            [('Income', [350, 400]), ('Expenses', [30, 40]),
+             ('Interest', [1, 2])],
+        ))
+        merged = history.merge(recent)
+        self.assertEqual(merged.months, [
+            ordinal(name)
+            for name in ('Jan 2026', 'Feb 2026', 'Mar 2026', 'Apr 2026')
+        ])
+        self.assertEqual(
+            [label for key, label, amounts in merged.lines],
+            ['Income', 'Refunds', 'Expenses', 'Interest'],
+        )
+        self.assertEqual(self.get_amounts(merged), {
+            'Income': {
+                'Jan 2026': 100.0, 'Feb 2026': 200.0, 'Mar 2026': 350.0,
+                'Apr 2026': 400.0,
+            },
+            'Refunds': {'Jan 2026': 5.0, 'Feb 2026': 6.0},
+            'Expenses': {
+                'Jan 2026': 10.0, 'Feb 2026': 20.0, 'Mar 2026': 30.0,
+                'Apr 2026': 40.0,
+            },
+            'Interest': {'Mar 2026': 1.0, 'Apr 2026': 2.0},
+        })
+
+        # and the merged report reads back the same
+        stream = io.BytesIO()
+        merged.save(stream, has_total=True)
+        saved = self.read(stream.getvalue())
+        self.assertEqual(saved.months, merged.months)
+        self.assertEqual(saved.lines, merged.lines)
+
+    def test_repeated_labels(self):
+        history = self.read(make_report(
+            ['Jan 2026'], [('Total', [1]), ('Other', [2]), ('Total', [3])],
+        ))
+        recent = self.read(make_report(
+            ['Feb 2026'], [('Total', [4]), ('Other', [5]), ('Total', [6])],
+        ))
+        merged = history.merge(recent)
+        self.assertEqual(
+            [sorted(amounts.values()) for key, label, amounts in merged.lines],
+            [[1.0, 4.0], [2.0, 5.0], [3.0, 6.0]],
+        )
+
+
+class StoreDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_root = utils.DATA_ROOT
+        utils.DATA_ROOT = tempfile.mkdtemp()
+        self.report = ProfitLoss()
+
+    def tearDown(self):
+        shutil.rmtree(utils.DATA_ROOT)
+        utils.DATA_ROOT = self.data_root
+
+    def download(self, data):
+        filename = os.path.join(utils.DATA_ROOT, 'download.xlsx')
+        with open(filename, 'wb') as stream:
+            stream.write(data)
+        return self.report.store_download(filename)
+
+    def read_local(self):
+        return MonthlyWorksheet.read(
+            self.report, self.report.filename, has_total=True,
+        )
+
+    def test_identical_download_is_skipped(self):
+        data = make_report(['Jan 2026', 'Feb 2026'], [('Income', [1, 2])])
+        self.assertTrue(self.download(data))
+        with open(self.report.filename, 'rb') as stream:
+            self.assertEqual(stream.read(), data)
+        modified = int(os.path.getmtime(self.report.filename)) - 60
+        os.utime(self.report.filename, (modified, modified))
+
+        self.assertFalse(self.download(data))
+        self.assertEqual(os.path.getmtime(self.report.filename), modified)
+        self.assertFalse(
+            os.path.exists(os.path.join(utils.DATA_ROOT, 'download.xlsx')),
+        )
+
+    def test_revised_download_is_merged(self):
+
+        # the total income is on the eighth row, like in quickbooks
+        self.download(make_report(['Jan 2026', 'Feb 2026'], [
+            ('Income', [None, None]), ('Sales', [1, 2]),
+            ('Total Income', [1, 2]),
+        ]))
+        self.assertTrue(self.download(make_report(['Feb 2026', 'Mar 2026'], [
+            ('Income', [None, None]), ('Sales', [20, 3]),
+            ('Total Income', [20, 3]),
+        ])))
+        local = self.read_local()
+        self.assertEqual(len(local.months), 3)
+        self.assertEqual(sorted(local.lines[2][2].values()), [1.0, 3.0, 20.0])
+
+        # the records come from the merged report
+        self.assertEqual(
+            [amount for date, amount in self.report.get_records()],
+            [1.0, 20.0, 3.0],
+        )
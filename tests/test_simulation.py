@@ -0,0 +1,51 @@
+import unittest
+
+import numpy
+
+from a_model import simulation
+
+PAYMENTS = (
+    [-1, 0, 1], [30000.0, 20000.0, 15000.0], [1, 2], [25000.0, 40000.0],
+)
+N_MONTHS = 6
+
+# a partial block at the end, so the shards are not all the same size
+N_UNIVERSES = 5 * simulation.BLOCK_SIZE + 37
+
+
+class SimulateRevenuesInBlocksTest(unittest.TestCase):
+
+    def simulate(self, n_universes=N_UNIVERSES, **kwargs):
+        return simulation.simulate_revenues_in_blocks(
+            PAYMENTS, N_MONTHS, n_universes, master_seed=3, **kwargs
+        )
+
+    def test_same_for_any_number_of_workers(self):
+        revenues = self.simulate(n_workers=1)
+        self.assertEqual(revenues.shape, (N_UNIVERSES, N_MONTHS))
+        for n_workers in (2, 3):
+            numpy.testing.assert_array_equal(
+                self.simulate(n_workers=n_workers), revenues,
+            )
+
+    def test_more_workers_than_blocks(self):
+        numpy.testing.assert_array_equal(
+            self.simulate(n_universes=50, n_workers=4),
+            self.simulate(n_universes=50),
+        )
+
+    def test_pick_up_where_it_left_off(self):
+        revenues = self.simulate()
+        n_first = 2 * simulation.BLOCK_SIZE
+        more = self.simulate(
+            n_universes=N_UNIVERSES - n_first, first_block=2, n_workers=2,
+        )
+        numpy.testing.assert_array_equal(
+            numpy.vstack([revenues[:n_first], more]), revenues,
+        )
+
+    def test_different_seeds(self):
+        other = simulation.simulate_revenues_in_blocks(
+            PAYMENTS, N_MONTHS, N_UNIVERSES, master_seed=4,
+        )
+        self.assertFalse(numpy.array_equal(self.simulate(), other))